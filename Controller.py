@@ -1,10 +1,8 @@
 from PyQtView import Cmds
 from PyQt5.QtWidgets import QDialog, QDialogButtonBox, QLabel, QVBoxLayout, QLineEdit
 
-import re
-
 import sudoku as sd
-import sudoku_pattern as sdp
+import sudoku_generate as sdg
 from SudokuModel import SudokuModel
 
 
@@ -34,22 +32,30 @@ class ImportBoardDialog(QDialog):
 
 
 class Controller:
-    def __init__(self, _view, _model):
+    def __init__(self, _view, _model, solver_options=None):
         func_map = {Cmds.NUM: self.SelectedCellValueUpdated,
                     Cmds.DEL: self.CellValueDeleted,
                     Cmds.MOUSE: self.MouseClick,
                     Cmds.CELLCLICK: self.CellClicked,
                     Cmds.IMPORT: self.ImportBoard,
+                    Cmds.GENERATE: self.GenerateBoard,
                     Cmds.RESTART: self.ResetBoard,
                     Cmds.SOLVE: self.Solve,
                     Cmds.FILLSINGLE: self.FillinSingleCandidatesStep,
                     Cmds.UPDATE: self.UpdatePossibleCandidates,
-                    Cmds.HIDSINGLE: self.HighlightHiddenSingles,
-                    Cmds.NAKEDPAIR: self.HighlightNakedPairs,
-                    Cmds.POINTPAIR: self.HighlightPointingPairs,
-                    Cmds.BOXLINE: self.HighlightBoxLinePairs,
-                    Cmds.BOXTRIPLE: self.HighlightBoxTriples,
-                    Cmds.XWING: self.HighlightXWings,
+                    Cmds.HIDSINGLE: lambda: self.HighlightPattern('hidden_single'),
+                    Cmds.NAKEDPAIR: lambda: self.HighlightPattern('naked_pair'),
+                    Cmds.NAKEDTRIPLE: lambda: self.HighlightPattern('naked_triple'),
+                    Cmds.NAKEDQUAD: lambda: self.HighlightPattern('naked_quad'),
+                    Cmds.HIDDENPAIR: lambda: self.HighlightPattern('hidden_pair'),
+                    Cmds.HIDDENTRIPLE: lambda: self.HighlightPattern('hidden_triple'),
+                    Cmds.HIDDENQUAD: lambda: self.HighlightPattern('hidden_quad'),
+                    Cmds.POINTPAIR: lambda: self.HighlightPattern('pointing_pair'),
+                    Cmds.BOXLINE: lambda: self.HighlightPattern('box_line_pair'),
+                    Cmds.BOXTRIPLE: lambda: self.HighlightPattern('box_triple'),
+                    Cmds.XWING: lambda: self.HighlightPattern('x_wing'),
+                    Cmds.SWORDFISH: lambda: self.HighlightPattern('swordfish'),
+                    Cmds.JELLYFISH: lambda: self.HighlightPattern('jellyfish'),
                     Cmds.REGEN: self.RegenerateCandidates,
                     Cmds.CLEAR: self.ClearHighlights}
 
@@ -59,6 +65,10 @@ class Controller:
 
         self.selected_cell = None
 
+        # Keyword options passed to SudokuModel.Solve eg {'backend': 'dlx'}.  By default stop
+        # counting at 2 solutions as we only need to show if the solution is unique.
+        self.solver_options = solver_options if solver_options is not None else {'max_solutions': 2}
+
         self.ResetBoard()
 
     ####################################################################################################################
@@ -69,9 +79,9 @@ class Controller:
             i, j = self.selected_cell.i, self.selected_cell.j
 
             if self.selected_cell.CanEdit() and self.model.GetCell(i, j) != value:
-                self.model.SetCell(i, j, value)
+                changed_cells = self.model.SetCell(i, j, value)
                 self.selected_cell.UpdateValue(value)
-                self.ShowInvalidCells()
+                self.ShowChangedInvalidCells(changed_cells)
 
     def CellValueDeleted(self):
         """ Called when user deletes a value from a cell """
@@ -97,13 +107,10 @@ class Controller:
 
                 # If candidate clicked then toggle it
                 if cand > 0:
-                    i, j = clicked_cell.i, clicked_cell.j
-                    if cand in self.model.GetCands(i, j):
-                        self.model.GetCands(i, j).remove(cand)
-                        clicked_cell.RemoveCandidate(cand)
-                    else:
-                        self.model.GetCands(i, j).add(cand)
+                    if self.model.ToggleCandidate(clicked_cell.i, clicked_cell.j, cand):
                         clicked_cell.AddCandidate(cand)
+                    else:
+                        clicked_cell.RemoveCandidate(cand)
 
         self.selected_cell = clicked_cell
 
@@ -117,9 +124,16 @@ class Controller:
 
     def ShowInvalidCells(self):
         """ Displays if the solution is no longer valid, due to duplicate numbers """
-        dups = sd.FindDuplicates(self.model.GetBoard())
-        self.view.ShowInvalidCells(dups)
-        if not sd.CheckValid(dups):
+        self.view.ShowInvalidCells(self.model.GetInvalidCells())
+        self.ShowBoardValidity()
+
+    def ShowChangedInvalidCells(self, changed_cells):
+        """ Update the invalid display of only the cells whose validity changed after an edit """
+        self.view.UpdateCellValidity(changed_cells, self.model.GetInvalidCells())
+        self.ShowBoardValidity()
+
+    def ShowBoardValidity(self):
+        if not self.model.BoardValid():
             self.view.SetNumSolutions(-1)
         else:
             self.view.SetNumSolutions(None)
@@ -132,26 +146,25 @@ class Controller:
         if not dlg.exec():
             return
 
-        str_board = dlg.GetString()
-        reg = re.compile('^[0-9.*_]*$')
-
-        if len(str_board) != 81 or not reg.match(str_board):
+        board = sd.BoardFromString(dlg.GetString())
+        if board is None:
             print('Invalid board entered')
             return
 
-        for c in '._*':
-            str_board = str_board.replace(c, '0')
-
-        board = [int(s) for s in str_board]
-        board = [board[i:i+9] for i in range(0, 81, 9)]
+        self.model = SudokuModel(board, self.model.solution_cache)
+        self.ResetBoard()
 
-        self.model = SudokuModel(board)
+    def GenerateBoard(self):
+        """ Replace the board with a newly generated puzzle """
+        generated = sdg.GeneratePuzzle(symmetry='rotational')
+        self.model = SudokuModel(sd.BoardFromString(generated.puzzle), self.model.solution_cache)
         self.ResetBoard()
 
     def ResetBoard(self):
         self.model.ResetBoard()
         self.view.UpdateAllCells(self.model.GetBoard(), initial=True)
         self.view.SetNumSolutions(None)
+        self.view.SetSolveStats(None)
         self.view.ClearHighlights()
         self.RegenerateCandidates()
         self.ShowInvalidCells()
@@ -161,11 +174,14 @@ class Controller:
         if sd.BoardSolved(self.model.curr_board):
             return
 
-        num_solns = self.model.Solve()
+        num_solns = self.model.Solve(**self.solver_options)
         self.view.UpdateAllCells(self.model.GetBoard())
         self.view.ClearHighlights()
         self.ShowInvalidCells()
-        self.view.SetNumSolutions(num_solns)
+
+        max_solns = self.solver_options.get('max_solutions')
+        self.view.SetNumSolutions(num_solns, at_least=max_solns is not None and num_solns >= max_solns > 1)
+        self.view.SetSolveStats(self.model.GetSolveStats())
 
     def FillinSingleCandidatesStep(self):
         """ Look for cells with only 1 candidate and fill them in.
@@ -183,43 +199,9 @@ class Controller:
         self.view.ClearHighlights()
         self.view.UpdateAllCandidates(self.model.GetAllCands())
 
-    def HighlightHiddenSingles(self):
-        """ Highlight where there are hidden single candidates """
-        hidden_singles = sdp.HiddenSingles(self.model.GetBoard(), self.model.GetAllCands())
-        self.view.ClearHighlights()
-        self.view.HighlightValues(hidden_singles)
-
-    def HighlightNakedPairs(self):
-        """ Highlight where there are naked pair candidates """
-        values, removals = sdp.NakedPairs(self.model.GetBoard(), self.model.GetAllCands())
-
-        self.view.ClearHighlights()
-        self.view.HighlightValues(values)
-        self.view.HighlightRemovals(removals)
-
-    def HighlightPointingPairs(self):
-        values, removals = sdp.PointingPairs(self.model.GetBoard(), self.model.GetAllCands())
-
-        self.view.ClearHighlights()
-        self.view.HighlightValues(values)
-        self.view.HighlightRemovals(removals)
-
-    def HighlightBoxLinePairs(self):
-        values, removals = sdp.BoxLinePairs(self.model.GetBoard(), self.model.GetAllCands())
-
-        self.view.ClearHighlights()
-        self.view.HighlightValues(values)
-        self.view.HighlightRemovals(removals)
-
-    def HighlightBoxTriples(self):
-        values, removals = sdp.BoxTriples(self.model.GetBoard(), self.model.GetAllCands())
-
-        self.view.ClearHighlights()
-        self.view.HighlightValues(values)
-        self.view.HighlightRemovals(removals)
-
-    def HighlightXWings(self):
-        values, removals = sdp.XWings(self.model.GetBoard(), self.model.GetAllCands())
+    def HighlightPattern(self, name):
+        """ Highlight the named pattern (see sudoku_pattern_cache.PATTERN_SLOTS) and the candidates it removes """
+        values, removals = self.model.FindPattern(name).ToPatternInfo()
 
         self.view.ClearHighlights()
         self.view.HighlightValues(values)
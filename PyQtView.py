@@ -10,32 +10,48 @@ class Cmds(Enum):
     MOUSE = auto()
     CELLCLICK = auto()
     IMPORT = auto()
+    GENERATE = auto()
     RESTART = auto()
     SOLVE = auto()
     FILLSINGLE = auto()
     UPDATE = auto()
     HIDSINGLE = auto()
     NAKEDPAIR = auto()
+    NAKEDTRIPLE = auto()
+    NAKEDQUAD = auto()
+    HIDDENPAIR = auto()
+    HIDDENTRIPLE = auto()
+    HIDDENQUAD = auto()
     POINTPAIR = auto()
     BOXLINE = auto()
     BOXTRIPLE = auto()
     XWING = auto()
+    SWORDFISH = auto()
+    JELLYFISH = auto()
     REGEN = auto()
     CLEAR = auto()
 
 
 def GenButtonMap():
     return {Cmds.IMPORT: 'Import Board',
+              Cmds.GENERATE: 'New Puzzle',
               Cmds.RESTART: 'Restart',
               Cmds.SOLVE: 'Solve',
               Cmds.FILLSINGLE: 'Fill Single Candidates',
               Cmds.UPDATE: 'Update Candidates',
               Cmds.HIDSINGLE: 'Highlight Hidden Singles',
               Cmds.NAKEDPAIR: 'Highlight Naked Pairs',
+              Cmds.NAKEDTRIPLE: 'Highlight Naked Triples',
+              Cmds.NAKEDQUAD: 'Highlight Naked Quads',
+              Cmds.HIDDENPAIR: 'Highlight Hidden Pairs',
+              Cmds.HIDDENTRIPLE: 'Highlight Hidden Triples',
+              Cmds.HIDDENQUAD: 'Highlight Hidden Quads',
               Cmds.POINTPAIR: 'Highlight Pointing Pairs',
               Cmds.BOXLINE: 'Highlight Box-Line Pairs',
               Cmds.BOXTRIPLE: 'Highlight Box Triples',
               Cmds.XWING: 'Highlight X-Wings',
+              Cmds.SWORDFISH: 'Highlight Swordfish',
+              Cmds.JELLYFISH: 'Highlight Jellyfish',
               Cmds.REGEN: 'Re-generate Candidates',
               Cmds.CLEAR: 'Clear Highlights'}
 
@@ -61,6 +77,11 @@ class PyQtSudokuView(QMainWindow):
         self.msgText.setStyleSheet("border: 1px solid black;")
         side_ui_layout.addWidget(self.msgText)
 
+        # Shows the search statistics of the last solve
+        self.statsText = QLabel('')
+        self.statsText.setStyleSheet("border: 1px solid black;")
+        side_ui_layout.addWidget(self.statsText)
+
         # Create UI button elements
         for cmd in button_map:
             title = button_map[cmd]
@@ -172,6 +193,12 @@ class PyQtSudokuView(QMainWindow):
         for cell in duplicate_cells:
             self.cells[cell[0]][cell[1]].SetValidity(is_invalid=True)
 
+    def UpdateCellValidity(self, changed_cells, invalid_cells):
+        """ Update the invalid highlight of only the cells (i,j) in changed_cells, those in
+        invalid_cells are shown as invalid """
+        for i, j in changed_cells:
+            self.cells[i][j].SetValidity(is_invalid=(i, j) in invalid_cells)
+
     ####################################################################################################################
 
     def UpdateAllCells(self, board, initial=False):
@@ -215,8 +242,8 @@ class PyQtSudokuView(QMainWindow):
 
     ####################################################################################################################
 
-    def SetNumSolutions(self, num_solns=None):
-        """ Sets the message area text """
+    def SetNumSolutions(self, num_solns=None, at_least=False):
+        """ Sets the message area text.  If at_least the solver stopped counting at num_solns. """
         if num_solns == 1 or num_solns is None:
             self.msgText.setStyleSheet("border: 1px solid black; color: black;")
         else:
@@ -227,5 +254,17 @@ class PyQtSudokuView(QMainWindow):
         elif num_solns < 0:
             self.msgText.setText('Num Solutions: ' + 'Board Invalid')
         else:
-            self.msgText.setText('Num Solutions: ' + str(num_solns))
-
+            self.msgText.setText('Num Solutions: ' + str(num_solns) + ('+' if at_least else ''))
+
+    def SetSolveStats(self, stats=None):
+        """ Show the search statistics (sudoku_search.SearchStats) of the last solve, None clears them """
+        if stats is None:
+            self.statsText.setText('')
+            return
+
+        self.statsText.setText('Nodes: {}, Backtracks: {}, Max Depth: {}\n'
+                               'Singles: {} naked, {} hidden\n'
+                               'Time: {:.1f} ms ({:.1f} ms propagating)'.format(
+                                    stats.nodes, stats.backtracks, stats.max_depth,
+                                    stats.naked_singles, stats.hidden_singles,
+                                    1e3 * stats.wall_seconds, 1e3 * stats.propagate_seconds))
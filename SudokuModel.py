@@ -1,17 +1,36 @@
-from copy import deepcopy
 import sudoku as sd
+import sudoku_coords as sdc
+import sudoku_search as sds
+from sudoku_board import Board
+from sudoku_cache import SolutionCache
+from sudoku_pattern_cache import PatternCache
 
 
 class SudokuModel:
-    def __init__(self, board):
+    def __init__(self, board, solution_cache=None):
         # Variables (Data)
-        self.orig_board = board
-        self.curr_board = deepcopy(board)
+        self.orig_board = Board(board)
+        self.curr_board = self.orig_board.ToList()
         self.cand_board = None
+        self.solve_stats = None
+
+        # Solver results for boards already solved, can be shared between models
+        self.solution_cache = solution_cache if solution_cache is not None else SolutionCache()
+
+        # Pattern search results, only searched again where cells or candidates have changed
+        self.patterns = PatternCache()
+
+        # Count of each digit in each of the 27 units, and the cells whose value is duplicated in a unit
+        self.unit_counts = None
+        self.invalid_cells = set()
+        self.RecountUnits()
 
     def ResetBoard(self):
-        self.curr_board = deepcopy(self.orig_board)
+        self.curr_board = self.orig_board.ToList()
         self.cand_board = None
+        self.solve_stats = None
+        self.patterns.MarkAllDirty()
+        self.RecountUnits()
 
     def GetBoard(self):
         return self.curr_board
@@ -19,44 +38,134 @@ class SudokuModel:
     def GetAllCands(self):
         return self.cand_board
 
+    def GetSolveStats(self):
+        """ SearchStats from the last call to Solve, None if not solved or the result came from the cache """
+        return self.solve_stats
+
     def GetCell(self, i, j):
         return self.curr_board[i][j]
 
     def GetCands(self, i, j):
         return self.cand_board[i][j]
 
+    def SetAllCands(self, cand_board):
+        """ Replace the candidate board, marking the cells whose candidates changed """
+        if self.cand_board is None:
+            self.patterns.MarkAllDirty()
+        else:
+            self.patterns.MarkCandidateChanges(self.cand_board, cand_board)
+        self.cand_board = cand_board
+
+    def ToggleCandidate(self, i, j, value):
+        """ Add or remove a candidate from a cell, returns True if the candidate is now present """
+        self.cand_board[i][j] ^= {value}
+        self.patterns.MarkCellChanged(i, j, {value})
+        return value in self.cand_board[i][j]
+
+    def FindPattern(self, name):
+        """ PatternResult for the named pattern in the current board, see sudoku_pattern_cache """
+        return self.patterns.Find(name, self.curr_board, self.cand_board)
+
     def SetCell(self, i, j, value):
+        """ Set the value of a cell, returns the set of cells (i,j) whose validity changed as a result.
+        Only this cell and its peers holding the old or new value can change, so this avoids rescanning the
+        board. """
+        old_value = self.curr_board[i][j]
+        if old_value == value:
+            return set()
+
+        k = 9 * i + j
+        for u in sdc.CELL_UNITS[k]:
+            if old_value:
+                self.unit_counts[u][old_value] -= 1
+            if value:
+                self.unit_counts[u][value] += 1
         self.curr_board[i][j] = value
+        self.patterns.MarkCellChanged(i, j)
+
+        affected = [(i, j)] + [(pi, pj) for pi, pj in sdc.PEER_COORDS[k]
+                               if self.curr_board[pi][pj] and self.curr_board[pi][pj] in (old_value, value)]
+
+        changed = set()
+        for cell in affected:
+            is_invalid = self.CellIsInvalid(*cell)
+            if is_invalid != (cell in self.invalid_cells):
+                changed.add(cell)
+                if is_invalid:
+                    self.invalid_cells.add(cell)
+                else:
+                    self.invalid_cells.discard(cell)
+
+        return changed
+
+    ###########################################################################
+    # Validity tracking
+
+    def RecountUnits(self):
+        """ Rebuild the digit counts for each unit and the set of invalid cells from the current board """
+        self.unit_counts = [[0] * 10 for _ in range(27)]
+        for k, units in enumerate(sdc.CELL_UNITS):
+            value = self.curr_board[k // 9][k % 9]
+            if value:
+                for u in units:
+                    self.unit_counts[u][value] += 1
+
+        self.invalid_cells = {(i, j) for i in range(9) for j in range(9) if self.CellIsInvalid(i, j)}
+
+    def CellIsInvalid(self, i, j):
+        """ True if the value in cell (i,j) is duplicated in its row, column or block """
+        value = self.curr_board[i][j]
+        return value != 0 and any(self.unit_counts[u][value] > 1 for u in sdc.CELL_UNITS[9 * i + j])
+
+    def GetInvalidCells(self):
+        return self.invalid_cells
+
+    def BoardValid(self):
+        return not self.invalid_cells
+
+    ###########################################################################
 
     def RegenCandidates(self):
-        self.cand_board = sd.SolveCandidates(self.curr_board)
+        self.SetAllCands(sd.SolveCandidates(self.curr_board))
 
     def UpdateCandidates(self):
-        self.cand_board = sd.SolveCandidatesIntersect(self.curr_board, self.cand_board)
+        self.SetAllCands(sd.SolveCandidatesIntersect(self.curr_board, self.cand_board))
 
     def FillinSingleCandidatesStep(self):
         """ Fills in any empty cells with only a single candidate """
-        if not sd.BoardIsValid(self.curr_board):
+        if not self.BoardValid():
             return
 
         for i in range(0, 9):
             for j in range(0, 9):
                 if len(self.cand_board[i][j]) == 1 and self.curr_board[i][j] == 0:
-                    self.curr_board[i][j] = next(iter(self.cand_board[i][j]))
+                    self.SetCell(i, j, next(iter(self.cand_board[i][j])))
 
-        self.cand_board = sd.SolveCandidatesIntersect(self.curr_board, self.cand_board)
+        self.UpdateCandidates()
 
-    def Solve(self):
+    def Solve(self, backend='backtrack', max_solutions=None, **options):
+        """ Solve the current board with the named solver backend (see sudoku.solver_backends).
+        If max_solutions is given the count returned stops at that limit.  Other options are passed
+        to the backend, the backtracking solver defaults to the propagate mode with MRV
+        branching.  Results are cached so solving the same board again is a lookup. """
         num_solns = 0
+        self.solve_stats = None
 
-        if not sd.BoardIsValid(self.curr_board):
+        if not self.BoardValid():
             print('Invalid')
             num_solns = -1
             return num_solns
 
-        print('Start Solver')
-        num_solns, soln_board = sd.SolvewBacktrack(self.curr_board)
-        print('End Solver')
+        if backend == 'backtrack':
+            options.setdefault('mode', 'propagate')
+            options.setdefault('branching', 'mrv')
+
+        hits = self.solution_cache.hits
+        self.solve_stats = sds.SearchStats()
+        num_solns, soln_board = self.solution_cache.Solve(self.curr_board, backend, max_solutions=max_solutions,
+                                                          stats=self.solve_stats, **options)
+        if self.solution_cache.hits > hits:
+            self.solve_stats = None     # No search was done
 
         # Prob not needed but here as a failsafe
         if num_solns == 0:
@@ -64,6 +173,8 @@ class SudokuModel:
         elif num_solns == 1:
             print('Single Solution')
             self.curr_board = soln_board
+            self.patterns.MarkAllDirty()
+            self.RecountUnits()
         else:
             print('Multiple Solutions')
 
@@ -0,0 +1,183 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import sudoku as sd
+import sudoku_boards as sb
+import sudoku_pattern as sdp
+import sudoku_search as sds
+
+###############################################################################
+# Benchmarks for the solver, candidate and pattern hot paths
+#
+# Each function is timed over every board in sudoku_boards plus the bundled
+# corpus of hard puzzles in benchmark_puzzles.txt.  Results are written as
+# JSON so runs can be compared, and a run can be checked against a baseline
+# with a slowdown threshold.
+
+CORPUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_puzzles.txt')
+
+BOARD_NAMES = ['easyboard', 'medboard', 'hardboard', 'vhardboard', 'xwingboard', 'tripboard', 'obsboard',
+               'expertboard', 'expertboard2', 'multi_board', 'test_board']
+
+PATTERN_FUNCS = ['HiddenSingles', 'NakedPairs', 'PointingPairs', 'BoxLinePairs', 'BoxTriples', 'XWings', 'Swordfish',
+                 'Jellyfish']
+
+
+def LoadBoards(corpus_file=CORPUS_FILE):
+    """ Dict of benchmark boards by name, from sudoku_boards and the corpus file (one puzzle per line,
+    lines starting with # are comments) """
+    boards = {name: getattr(sb, name) for name in BOARD_NAMES}
+
+    if corpus_file and os.path.exists(corpus_file):
+        with open(corpus_file) as f:
+            puzzles = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+        for n, puzzle in enumerate(puzzles):
+            boards['corpus_{:02d}'.format(n)] = sd.BoardFromString(puzzle)
+
+    return boards
+
+
+def CountNodes(board, solver_options):
+    """ Number of search nodes the backtracking solver visits for a board.  Done in a separate run so
+    timing is not affected. """
+    stats = sds.SearchStats()
+    sd.SolvewBacktrack(board, stats=stats, **solver_options)
+    return stats.nodes
+
+
+def BenchmarkTargets(solver_options):
+    """ Dict of benchmark name to a function taking (board, cand_board) """
+    targets = {'SolvewBacktrack': lambda board, cand_board: sd.SolvewBacktrack(board, **solver_options),
+               'SolveCandidates': lambda board, cand_board: sd.SolveCandidates(board),
+               'FindDuplicates': lambda board, cand_board: sd.FindDuplicates(board)}
+    for name in PATTERN_FUNCS:
+        targets[name] = getattr(sdp, name)
+    targets['NakedSubsets'] = lambda board, cand_board: [sdp.NakedSubsets(board, cand_board, n) for n in (2, 3, 4)]
+    targets['HiddenSubsets'] = lambda board, cand_board: [sdp.HiddenSubsets(board, cand_board, n) for n in (2, 3, 4)]
+    return targets
+
+
+def TimeFunc(func, board, cand_board, repeats):
+    """ List of run times in seconds """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(board, cand_board)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def PeakMemory(func, board, cand_board):
+    """ Peak memory allocated in bytes during a single run """
+    tracemalloc.start()
+    try:
+        func(board, cand_board)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def Percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def RunBenchmarks(boards, targets, repeats=20, solver_options=None, progress=None):
+    """ Run each target over each board.  Returns a dict of target name to a dict of board name to results
+    with the median and 95th percentile time in ms, peak memory in KiB and nodes visited for the solver. """
+    solver_options = solver_options if solver_options is not None else {}
+    results = {}
+
+    for target_name, func in targets.items():
+        results[target_name] = {}
+        for board_name, board in boards.items():
+            cand_board = sd.SolveCandidates(board)
+            times = TimeFunc(func, board, cand_board, repeats)
+
+            result = {'median_ms': 1e3 * statistics.median(times),
+                      'p95_ms': 1e3 * Percentile(times, 0.95),
+                      'peak_kib': PeakMemory(func, board, cand_board) / 1024}
+            if target_name == 'SolvewBacktrack':
+                result['nodes'] = CountNodes(board, solver_options)
+
+            results[target_name][board_name] = result
+            if progress:
+                progress(target_name, board_name, result)
+
+    return results
+
+
+def CompareResults(current, baseline, threshold=1.25, min_ms=0.05):
+    """ List of (target, board, baseline ms, current ms) where the current median time is more than threshold
+    times the baseline.  Entries where both are under min_ms are ignored as timing noise. """
+    regressions = []
+    for target_name, board_results in current['results'].items():
+        for board_name, result in board_results.items():
+            base = baseline['results'].get(target_name, {}).get(board_name)
+            if base is None or max(base['median_ms'], result['median_ms']) < min_ms:
+                continue
+            if result['median_ms'] > threshold * base['median_ms']:
+                regressions.append((target_name, board_name, base['median_ms'], result['median_ms']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the solver, candidate and pattern functions.')
+    parser.add_argument('-o', '--output', default='-', help='JSON results file, - for stdout')
+    parser.add_argument('-r', '--repeats', type=int, default=20, help='timed runs per function and board')
+    parser.add_argument('-t', '--targets', nargs='*', help='only run these functions')
+    parser.add_argument('--corpus', default=CORPUS_FILE, help='file of extra puzzles, one per line')
+    parser.add_argument('--mode', default='propagate', choices=['copy', 'trail', 'propagate'],
+                        help='SolvewBacktrack mode')
+    parser.add_argument('--branching', default='mrv', choices=sorted(sd.branch_funcs),
+                        help='SolvewBacktrack branching strategy')
+    parser.add_argument('--baseline', help='JSON results of a previous run to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='fail if a median time is more than this multiple of the baseline')
+    parser.add_argument('--min-ms', type=float, default=0.05, help='ignore timings below this in the comparison')
+    args = parser.parse_args(argv)
+
+    solver_options = {'mode': args.mode, 'branching': args.branching}
+    targets = BenchmarkTargets(solver_options)
+    if args.targets:
+        targets = {name: targets[name] for name in args.targets}
+
+    def Progress(target_name, board_name, result):
+        print('{:16} {:14} {:9.3f} ms'.format(target_name, board_name, result['median_ms']), file=sys.stderr)
+
+    results = RunBenchmarks(LoadBoards(args.corpus), targets, args.repeats, solver_options, Progress)
+    report = {'meta': {'python': platform.python_version(),
+                       'platform': platform.platform(),
+                       'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                       'repeats': args.repeats,
+                       'solver_options': solver_options},
+              'results': results}
+
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=1)
+        print()
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = CompareResults(report, baseline, args.threshold, args.min_ms)
+        for target_name, board_name, base_ms, curr_ms in regressions:
+            print('Regression {} {}: {:.3f} ms -> {:.3f} ms'.format(target_name, board_name, base_ms, curr_ms),
+                  file=sys.stderr)
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
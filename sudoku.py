@@ -1,32 +1,55 @@
 from copy import deepcopy
+import re
+import time
 import sudoku_coords as sdc
-from sudoku_pattern import HiddenSingles
+import sudoku_bitmask as sdb
+import sudoku_search as sds
+import sudoku_dlx as sdx
+
+
+###############################################################################
+# Board string format
+
+BOARD_STRING_REGEX = re.compile('^[0-9.*_]{81}$')
+
+
+def BoardFromString(str_board):
+    """ Convert a string of 81 numbers, with blanks as 0, *, _ or '.', into a board (9x9 list of ints).
+    Returns None if the string is not in that format. """
+    if not BOARD_STRING_REGEX.fullmatch(str_board):
+        return None
+
+    for c in '._*':
+        str_board = str_board.replace(c, '0')
+
+    board = [int(s) for s in str_board]
+    return [board[i:i+9] for i in range(0, 81, 9)]
+
+
+def BoardToString(board):
+    """ Convert a board to a string of 81 numbers with blanks as 0 """
+    return ''.join(str(value) for row in board for value in row)
 
 
 ###############################################################################
 # Board validity code
 
 
-def FindUnitDuplicates(unit_list, coord_func):
-    """ Loop thro each unit (row or col etc) and return location of any duplicate numbers as a list of
-    tuple coord (i,j) pairs """
+def FindUnitDuplicates(board, unit_coords):
+    """ Loop thro each unit (row or col etc), given as a tuple of cell coords, and return location of any
+    duplicate numbers as a list of tuple coord (i,j) pairs """
     duplicates = []
-    for u, unit_cells in enumerate(unit_list):
+    for unit in unit_coords:
+        unit_cells = [board[i][j] for i, j in unit]
         duplicated_numbers = [n for n in range(1, 10) if unit_cells.count(n) > 1]
-        duplicates += [coord_func(u, c) for n in duplicated_numbers for c, elem in enumerate(unit_cells) if elem == n]
+        duplicates += [unit[c] for n in duplicated_numbers for c, elem in enumerate(unit_cells) if elem == n]
 
     return duplicates
 
 
 def FindDuplicates(board):
     """ Find duplicate entries on any row, column or block """
-
-    row_duplicates = FindUnitDuplicates(board, sdc.GetCellCoordsFromRowID)
-    col_duplicates = FindUnitDuplicates([sdc.GetColCells(board, j) for j in range(0, 9)], sdc.GetCellCoordsFromColID)
-    block_duplicates = FindUnitDuplicates([sdc.GetBlockCells_BlockID(board, b) for b in range(0, 9)],
-                                          sdc.GetCellCoordsFromBlockID)
-
-    return row_duplicates + col_duplicates + block_duplicates
+    return FindUnitDuplicates(board, sdc.UNIT_COORDS)
 
 
 def CheckValid(list_of_duplicates):
@@ -47,25 +70,29 @@ def RemoveZeros(input_list):
     return list(filter(lambda a: a != 0, input_list))
 
 
-def GetCellCandidateSet(board, i, j):
-    """ Find possible values in a cell """
+def GetCellCandidateMask(board, i, j):
+    """ Find possible values in a cell as a bitmask """
 
     if board[i][j] == 0:
-        block_values = set(RemoveZeros(sdc.GetBlockCells_CellID(board, i, j)))
-        row_values = set(RemoveZeros(sdc.GetRowCells(board, i)))
-        col_values = set(RemoveZeros(sdc.GetColCells(board, j)))
+        used = 0
+        for pi, pj in sdc.PEER_COORDS[9 * i + j]:
+            used |= sdb.DIGIT_BITS[board[pi][pj]]
 
-        return set(range(1, 10)) - block_values - row_values - col_values
+        return sdb.ALL_CANDS & ~used
     else:
-        return {board[i][j]}
+        return sdb.DIGIT_BITS[board[i][j]]
+
+
+def GetCellCandidateSet(board, i, j):
+    """ Find possible values in a cell """
+    return sdb.MaskToSet(GetCellCandidateMask(board, i, j))
 
 
 def SolveCandidates(board):
     """ Takes a Sudoku board (2d 9x9 list of ints with 0 as empty cell) and
     returns a board that is a 2d 9x9 list of sets.  Each set is the possible
     int values. Known values are now sets with 1 item. """
-    cand_board = [[GetCellCandidateSet(board, i, j) for j in range(9)] for i in range(9)]
-    return cand_board
+    return sdb.CandidateMasks(board).ToCandBoard()
 
 
 def SolveCandidatesIntersect(board, orig_cand_board):
@@ -75,12 +102,9 @@ def SolveCandidatesIntersect(board, orig_cand_board):
     This version compares to the previous candidates and returns only
     candidates in both sets.
     This prevents candidates previously removed from being added back."""
-
-    def solve_cell_candidates(i, j):
-        possible_candidates = GetCellCandidateSet(board, i, j)
-        return orig_cand_board[i][j].intersection(possible_candidates)
-
-    return [[solve_cell_candidates(i, j) for j in range(9)] for i in range(9)]
+    cand_masks = sdb.CandidateMasks(board)
+    cand_masks.Intersect(orig_cand_board)
+    return cand_masks.ToCandBoard()
 
 
 def UpdateCandidates(value, i, j, orig_cand_board):
@@ -89,17 +113,8 @@ def UpdateCandidates(value, i, j, orig_cand_board):
     cand_board = deepcopy(orig_cand_board)
     cand_board[i][j] = {value}
 
-    b = sdc.GetBlockIDFromCellCoords(i, j)
-
-    # Find indices of all cells in same col, row and block as cell (i,j)
-    idx = {(i, rj) for rj in range(9)}  # Row
-    idx = idx.union({(ri, j) for ri in range(9)})  # Column
-    idx = idx.union({sdc.GetCellCoordsFromBlockID(b, k) for k in range(0, 9)})  # Block
-    idx.remove((i, j))
-
-    # For each of these cells remove the value as a candidate
-    for cds in idx:
-        ci, cj = cds
+    # For all cells in same col, row and block as cell (i,j) remove the value as a candidate
+    for ci, cj in sdc.PEER_COORDS[9 * i + j]:
         cand_board[ci][cj].discard(value)
 
     return cand_board
@@ -115,72 +130,176 @@ def FindFirstEmptyCell(board):
     return next(zero_iter, None)
 
 
+def FindMRVCell(board):
+    """ Find the coords of the empty cell with the fewest candidates (minimum remaining values).
+    Ties are broken by degree, ie the cell with the most empty cells in its row, column and block. """
+    best_cells, best_count = [], 10
+    for i in range(9):
+        for j in range(9):
+            if board[i][j] == 0:
+                count = sdb.BIT_COUNT[GetCellCandidateMask(board, i, j)]
+                if count < best_count:
+                    best_cells, best_count = [(i, j)], count
+                elif count == best_count:
+                    best_cells.append((i, j))
+
+    if len(best_cells) > 1:
+        return max(best_cells, key=lambda cell: EmptyPeerCount(board, *cell))
+    return next(iter(best_cells), None)
+
+
+def EmptyPeerCount(board, i, j):
+    """ Number of empty cells sharing a row, column or block with cell (i,j) """
+    return sum(1 for pi, pj in sdc.PEER_COORDS[9 * i + j] if board[pi][pj] == 0)
+
+
+# Functions to pick the next cell to branch on in the backtracking solver
+branch_funcs = {'first': FindFirstEmptyCell, 'mrv': FindMRVCell}
+
+
 def BoardSolved(board):
     """ Check all cells have a value.  Assumes board is valid. """
     return FindFirstEmptyCell(board) is None
 
 
+def PropagateSingles(board, cand_board, hidden=True):
+    """ Fill in naked singles, and hidden singles if hidden is True, until no more to fill in.
+    Uses the worklist propagation in sudoku_bitmask, so only cells and units affected by each placement are
+    revisited.  Candidates previously removed from cand_board stay removed.
+    Returns (board, cand_board, num_naked, num_hidden), the counts are None if a contradiction was found. """
+    cand_masks = sdb.CandidateMasks(board)
+    cand_masks.Intersect(cand_board)
+
+    num_placed = cand_masks.Propagate(hidden=hidden)
+    num_naked, num_hidden = num_placed if num_placed is not None else (None, None)
+
+    return cand_masks.ToBoard(), cand_masks.ToCandBoard(), num_naked, num_hidden
+
+
 def FillinSingleCandidates_iterative(board, cand_board):
     """ Fill in cells with only a single candidate iteratively until no more to fill in """
-    single_candidates = [(i, j) for i in range(9) for j in range(9) if len(cand_board[i][j]) == 1 and board[i][j] == 0]
-    if len(single_candidates) > 0:
-        for i, j in single_candidates:
-            board[i][j] = next(iter(cand_board[i][j]))
-        cand_board = SolveCandidatesIntersect(board, cand_board)
+    board, cand_board, _, _ = PropagateSingles(board, cand_board, hidden=False)
+    return board, cand_board
 
-        # Repeat until no changes needed
-        board, cand_board = FillinSingleCandidates_iterative(board, cand_board)
 
+def FillinHiddenSingles_iterative(board, cand_board):
+    """ Fill in hidden single and single candidates iteratively until no more to fill in """
+    board, cand_board, _, _ = PropagateSingles(board, cand_board)
     return board, cand_board
 
 
-def FillinHiddenSingles_iterative(board, cand_board):
-    """ Fill in hidden single candidates iteratively until no more to fill in """
-    hidden_singles = HiddenSingles(board, cand_board)
-    if len(hidden_singles) > 0:
+def SolvewBacktrack(board, initial=True, mode='copy', branching='first', max_solutions=None, eliminations=(),
+                    stats=None):
+    """ Solve the puzzle via the backtracking algorithm.
+    mode          - 'copy' copies the board at each node, 'trail' searches a single board in place and
+                    undoes changes on backtrack, which is much faster.  'propagate' is the trail search
+                    with naked and hidden singles filled in at every node.
+    branching     - 'first' branches on the first empty cell, 'mrv' on the cell with fewest candidates
+    max_solutions - stop searching once this many solutions are found, eg 2 to check uniqueness.
+                    None counts every solution.
+    eliminations  - for the 'propagate' mode, extra elimination hooks run at each node, see
+                    sudoku_search.elimination_funcs
+    stats         - optional sudoku_search.SearchStats, filled in with the nodes visited, time taken etc """
+    if branching not in branch_funcs:
+        raise ValueError('Unknown branching strategy ' + str(branching))
+
+    start = time.perf_counter()
+    if mode == 'trail':
+        result = sds.SolvewTrail(board, branching, max_solutions, stats)
+    elif mode == 'propagate':
+        result = sds.SolvewPropagate(board, branching, max_solutions, eliminations, stats)
+    elif mode == 'copy':
+        result = _SolvewCopy(board, initial, branching, max_solutions, stats, 0)
+    else:
+        raise ValueError('Unknown solver mode ' + str(mode))
 
-        for hidden_single in hidden_singles:
-            i, j, n = hidden_single.i, hidden_single.j, next(iter(hidden_single.candidates))
-            board[i][j] = n
-            cand_board = UpdateCandidates(n, i, j, cand_board)
+    if stats is not None:
+        stats.wall_seconds = time.perf_counter() - start
+    return result
 
-        # Repeat until no changes needed
-        board, cand_board = FillinSingleCandidates_iterative(board, cand_board)
 
-    return board, cand_board
+def IterSolutions(board, mode='propagate', branching='mrv', eliminations=(), stats=None):
+    """ Generator yielding each solution of the puzzle as a 9x9 list of lists as the search finds it, so
+    the caller can take the first few or stop at any point, eg itertools.islice(IterSolutions(board), 3).
+    mode, branching and eliminations are as for SolvewBacktrack, only the 'trail' and 'propagate' modes
+    are supported. """
+    if branching not in branch_funcs:
+        raise ValueError('Unknown branching strategy ' + str(branching))
+
+    if mode == 'trail':
+        return sds.IterTrail(board, branching, stats)
+    elif mode == 'propagate':
+        return sds.IterPropagate(board, branching, eliminations, stats)
+    raise ValueError('Unknown solver mode for IterSolutions ' + str(mode))
 
 
-def SolvewBacktrack(board, initial=True):
-    """ Solve the puzzle via the backtracking algorithm """
+def _SolvewCopy(board, initial, branching, max_solutions, stats, depth):
+    """ Backtracking search copying the board at each node """
     num_solns = 0
     soln_board = None
 
-    board_copy = deepcopy(board)
+    if stats is not None:
+        stats.Visit(depth)
+
+    board_copy = [list(row) for row in board]
 
     # First simplify the board by filling in naked and hidden singles
     if initial:
-        cand_board = SolveCandidates(board_copy)
-        board_copy, cand_board = FillinSingleCandidates_iterative(board_copy, cand_board)
-        board_copy, cand_board = FillinHiddenSingles_iterative(board_copy, cand_board)
+        propagate_start = time.perf_counter()
+        board_copy, cand_board, num_naked, num_hidden = PropagateSingles(board_copy, SolveCandidates(board_copy))
+        if stats is not None:
+            stats.naked_singles += num_naked or 0
+            stats.hidden_singles += num_hidden or 0
+            stats.propagate_seconds += time.perf_counter() - propagate_start
 
     #  Do backtrack solving but use the list of candidates in each cell to reduce search depth
-    #  Start by finding the first cell that has no known value, if all cells have values then board solved.
-    first_empty_cell = FindFirstEmptyCell(board_copy)
-    if first_empty_cell is not None:
-        i, j = first_empty_cell
+    #  Start by finding the cell to branch on that has no known value, if all cells have values then board solved.
+    empty_cell = branch_funcs[branching](board_copy)
+    if empty_cell is not None:
+        i, j = empty_cell
         possible_candidates = GetCellCandidateSet(board_copy, i, j)
 
         for candidate in iter(possible_candidates):
             # Try solution
             board_copy[i][j] = candidate
 
-            num_solns_loop, soln_board_loop = SolvewBacktrack(board_copy, initial=False)
+            remaining = None if max_solutions is None else max_solutions - num_solns
+            num_solns_loop, soln_board_loop = _SolvewCopy(board_copy, False, branching, remaining, stats, depth + 1)
             num_solns += num_solns_loop
-            if num_solns == 1 and soln_board_loop is not None:
+            if soln_board is None and soln_board_loop is not None:
                 soln_board = soln_board_loop
 
             board_copy[i][j] = 0
 
+            if stats is not None and not num_solns_loop:
+                stats.backtracks += 1
+            if max_solutions is not None and num_solns >= max_solutions:
+                break
+
         return num_solns, soln_board
     else:
-        return 1, deepcopy(board_copy)  # Solved!
+        return 1, [list(row) for row in board_copy]  # Solved!
+
+
+###############################################################################
+# Solver backends
+
+def SolvewDLX(board, max_solutions=None, stats=None):
+    """ Solve the puzzle as an exact cover problem using Dancing Links """
+    start = time.perf_counter()
+    result = sdx.SolvewDLX(board, max_solutions, stats)
+    if stats is not None:
+        stats.wall_seconds = time.perf_counter() - start
+    return result
+
+
+# Solvers by backend name.  Each takes a board plus keyword options and returns (num_solns, soln_board)
+solver_backends = {'backtrack': SolvewBacktrack, 'dlx': SolvewDLX}
+
+
+def Solve(board, backend='backtrack', **options):
+    """ Solve the puzzle with the named backend, options are passed to the backend eg max_solutions.
+    Returns (num_solns, soln_board) """
+    if backend not in solver_backends:
+        raise ValueError('Unknown solver backend ' + str(backend))
+    return solver_backends[backend](board, **options)
@@ -0,0 +1,203 @@
+import argparse
+import sys
+import time
+from dataclasses import dataclass
+from functools import partial
+from multiprocessing import Pool
+
+import sudoku as sd
+import sudoku_search as sds
+from sudoku_cache import SolutionCache
+
+###############################################################################
+# Batch solving of puzzle collections
+#
+# Puzzles are read one per line in the 81 character format accepted by
+# sudoku.BoardFromString, solved over a pool of worker processes in chunks
+# and the results returned in the same order as the input.  Each worker can
+# keep a cache of results so repeated puzzles are only solved once.
+
+# Cache of the current worker process, set up by _InitWorker
+_worker_cache = None
+
+
+@dataclass
+class BatchResult:
+    puzzle: str
+    solution: str       # Empty if no unique solution found
+    num_solns: int      # -1 if the line is not a valid board
+    seconds: float
+
+
+def SolvePuzzleString(str_board, backend='backtrack', cache=None, **options):
+    """ Solve a single puzzle in string format, returns a BatchResult.
+    cache - optional SolutionCache to look the puzzle up in """
+    start = time.perf_counter()
+
+    board = sd.BoardFromString(str_board)
+    if board is None or not sd.BoardIsValid(board):
+        return BatchResult(str_board, '', -1, time.perf_counter() - start)
+
+    if cache is not None:
+        num_solns, soln_board = cache.Solve(board, backend, **options)
+    else:
+        num_solns, soln_board = sd.Solve(board, backend, **options)
+    solution = sd.BoardToString(soln_board) if num_solns == 1 else ''
+
+    return BatchResult(str_board, solution, num_solns, time.perf_counter() - start)
+
+
+def _InitWorker(cache_size, canonical):
+    global _worker_cache
+    _worker_cache = SolutionCache(cache_size, canonical) if cache_size else None
+
+
+def _SolveInWorker(str_board, backend, **options):
+    return SolvePuzzleString(str_board, backend, _worker_cache, **options)
+
+
+def SolveBatch(puzzles, processes=None, chunksize=64, backend='backtrack', cache_size=0, canonical=False,
+               **options):
+    """ Solve an iterable of puzzle strings, yielding a BatchResult for each in input order.
+    processes  - number of worker processes, None uses all cores and 1 solves in this process
+    chunksize  - number of puzzles sent to a worker at a time
+    cache_size - results cached by each worker so duplicate puzzles are solved once, 0 for no cache
+    canonical  - cache on the canonical form so symmetric variants of a puzzle are also solved once
+    Other options are passed to sudoku.Solve eg max_solutions. """
+    if backend == 'backtrack':
+        options.setdefault('mode', 'propagate')
+        options.setdefault('branching', 'mrv')
+
+    if processes == 1:
+        cache = SolutionCache(cache_size, canonical) if cache_size else None
+        yield from map(partial(SolvePuzzleString, backend=backend, cache=cache, **options), puzzles)
+        return
+
+    with Pool(processes, _InitWorker, (cache_size, canonical)) as pool:
+        yield from pool.imap(partial(_SolveInWorker, backend=backend, **options), puzzles, chunksize)
+
+
+###############################################################################
+# Parallel exhaustive counting of one puzzle
+#
+# Counting every solution of a puzzle with many is a single long search, so
+# it is split into subproblems a few guesses deep (see
+# sudoku_search.IterSubproblems) which are counted over the pool.  Subtrees
+# vary a lot in size, so they are handed out one at a time to whichever
+# worker is free and summed in the order they finish.  The total does not
+# depend on that order, so is the same as the serial count.
+
+
+def _CountSubproblem(board, branching, eliminations):
+    return sds.SolvewPropagate(board, branching, None, eliminations)[0]
+
+
+def _SumCounts(counts, num_subproblems, progress):
+    num_solns = 0
+    for num_done, count in enumerate(counts, 1):
+        num_solns += count
+        if progress is not None:
+            progress(num_done, num_subproblems, num_solns)
+    return num_solns
+
+
+def CountSolutionsParallel(board, split_depth=4, processes=None, branching='mrv', eliminations=(), progress=None):
+    """ Count all the solutions of a board, splitting the search over a pool of worker processes.
+    split_depth  - number of guesses made before splitting, more gives more and smaller subproblems
+    processes    - number of worker processes, None uses all cores and 1 counts in this process
+    eliminations - names of extra elimination hooks, see sudoku_search.elimination_funcs
+    progress     - optional function called as progress(num_done, num_subproblems, num_solns) as each
+                   subproblem is counted """
+    subproblems = list(sds.IterSubproblems(board, split_depth, branching, eliminations))
+    count_func = partial(_CountSubproblem, branching=branching, eliminations=tuple(eliminations))
+
+    if processes == 1:
+        return _SumCounts(map(count_func, subproblems), len(subproblems), progress)
+
+    with Pool(processes) as pool:
+        return _SumCounts(pool.imap_unordered(count_func, subproblems, 1), len(subproblems), progress)
+
+
+def CountPuzzleString(str_board, split_depth=4, processes=None, **options):
+    """ Count all the solutions of a puzzle in string format with CountSolutionsParallel, returns a
+    BatchResult """
+    start = time.perf_counter()
+
+    board = sd.BoardFromString(str_board)
+    if board is None or not sd.BoardIsValid(board):
+        return BatchResult(str_board, '', -1, time.perf_counter() - start)
+
+    num_solns = CountSolutionsParallel(board, split_depth, processes, **options)
+    solution = sd.BoardToString(sd.Solve(board, mode='propagate', branching='mrv')[1]) if num_solns == 1 else ''
+
+    return BatchResult(str_board, solution, num_solns, time.perf_counter() - start)
+
+
+def ReadPuzzles(lines):
+    """ Yield the puzzle strings from lines of text, skipping blank lines """
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def FormatResult(result):
+    return '{},{},{},{:.6f}'.format(result.puzzle, result.solution, result.num_solns, result.seconds)
+
+
+def ReportProgress(num_done, num_subproblems, num_solns):
+    sys.stderr.write('{}/{} subproblems, {} solutions\n'.format(num_done, num_subproblems, num_solns))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Solve a file of sudoku puzzles, one 81 character puzzle per line. '
+                                                 'Writes puzzle,solution,num_solutions,seconds for each puzzle.')
+    parser.add_argument('input', nargs='?', default='-', help='puzzle file, - for stdin')
+    parser.add_argument('-o', '--output', default='-', help='results file, - for stdout')
+    parser.add_argument('-p', '--processes', type=int, default=None, help='worker processes, default all cores')
+    parser.add_argument('-c', '--chunksize', type=int, default=64, help='puzzles sent to a worker at a time')
+    parser.add_argument('--backend', default='backtrack', choices=sorted(sd.solver_backends))
+    parser.add_argument('--mode', default='propagate', choices=['copy', 'trail', 'propagate'],
+                        help='backtrack solver mode')
+    parser.add_argument('--branching', default='mrv', choices=sorted(sd.branch_funcs),
+                        help='backtrack solver branching strategy')
+    parser.add_argument('--max-solutions', type=int, default=2,
+                        help='stop counting solutions at this limit, 0 counts them all')
+    parser.add_argument('--cache-size', type=int, default=0,
+                        help='results cached by each worker so duplicate puzzles are solved once, 0 for no cache')
+    parser.add_argument('--canonical', action='store_true',
+                        help='cache on the canonical form of each puzzle so symmetric variants share a result')
+    parser.add_argument('--split-depth', type=int, default=0,
+                        help='count all the solutions of each puzzle in turn, splitting its search over the '
+                             'workers after this many guesses')
+    parser.add_argument('--progress', action='store_true',
+                        help='with --split-depth, report the subproblems counted on stderr')
+    args = parser.parse_args(argv)
+
+    options = {'max_solutions': args.max_solutions or None}
+    if args.backend == 'backtrack':
+        options.update(mode=args.mode, branching=args.branching)
+
+    in_file = sys.stdin if args.input == '-' else open(args.input)
+    out_file = sys.stdout if args.output == '-' else open(args.output, 'w')
+
+    try:
+        if args.split_depth:
+            progress = ReportProgress if args.progress else None
+            results = (CountPuzzleString(puzzle, args.split_depth, args.processes, branching=args.branching,
+                                         progress=progress) for puzzle in ReadPuzzles(in_file))
+        else:
+            results = SolveBatch(ReadPuzzles(in_file), args.processes, args.chunksize, args.backend,
+                                 args.cache_size, args.canonical, **options)
+
+        for result in results:
+            out_file.write(FormatResult(result) + '\n')
+    finally:
+        if in_file is not sys.stdin:
+            in_file.close()
+        if out_file is not sys.stdout:
+            out_file.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+from sudoku_coords import CELL_ROW, CELL_COL, CELL_BLOCK, CELL_UNITS, PEERS, UNITS
+
+###############################################################################
+# Bitmask candidate engine
+#
+# Candidates for a cell are held as a 9 bit int, with bit n-1 set if n is a
+# candidate.  The digits already used in each row, column and block are held
+# the same way, so finding the candidates of a cell is two ORs and a NOT.
+
+ALL_CANDS = 0x1FF
+
+# DIGIT_BITS[n] is the mask for the single digit n (index 0 is the empty mask)
+DIGIT_BITS = (0,) + tuple(1 << (n - 1) for n in range(1, 10))
+
+# Lookup tables indexed by a 9 bit mask
+BIT_COUNT = tuple(bin(m).count('1') for m in range(ALL_CANDS + 1))
+MASK_DIGITS = tuple(tuple(n for n in range(1, 10) if m & DIGIT_BITS[n]) for m in range(ALL_CANDS + 1))
+MASK_SETS = tuple(frozenset(digits) for digits in MASK_DIGITS)
+
+# Map a single bit mask back to its digit
+BIT_DIGIT = {DIGIT_BITS[n]: n for n in range(1, 10)}
+
+
+def MaskToSet(mask):
+    """ Convert a candidate mask into a set of ints """
+    return set(MASK_SETS[mask])
+
+
+def SetToMask(cand_set):
+    """ Convert a set (or any iterable) of ints 1-9 into a candidate mask """
+    mask = 0
+    for n in cand_set:
+        mask |= DIGIT_BITS[n]
+    return mask
+
+
+def CandBoardToMasks(cand_board):
+    """ Convert a 9x9 list of sets candidate board to a flat list of 81 masks """
+    return [SetToMask(cands) for row in cand_board for cands in row]
+
+
+def MasksToCandBoard(masks):
+    """ Convert a flat list of 81 masks to a 9x9 list of sets candidate board """
+    return [[set(MASK_SETS[m]) for m in masks[r:r + 9]] for r in range(0, 81, 9)]
+
+
+class CandidateMasks:
+    """ Candidates for a board held as masks.
+    cells       - flat list of the 81 cell values, row by row, 0 is an empty cell
+    row_used    - mask of digits already filled in each row
+    col_used    - mask of digits already filled in each column
+    block_used  - mask of digits already filled in each block
+    cands       - flat list of the 81 cell candidate masks.  Known cells hold the mask of their value.
+    valid       - False if a digit is duplicated in a row, column or block
+
+    Assign() fills in a cell and records every change on a trail, Undo() unwinds the trail back to a Mark(),
+    so a search can work on a single instance without copying it at each step. """
+
+    def __init__(self, board):
+        self.cells = [value for row in board for value in row]
+        self.row_used = [0] * 9
+        self.col_used = [0] * 9
+        self.block_used = [0] * 9
+        self.valid = True
+
+        # Trail of (cell, previous candidate mask) and list of cells filled in by Assign()
+        self.trail = []
+        self.assigned = []
+
+        for k, value in enumerate(self.cells):
+            if value:
+                bit = DIGIT_BITS[value]
+                if (self.row_used[CELL_ROW[k]] | self.col_used[CELL_COL[k]] | self.block_used[CELL_BLOCK[k]]) & bit:
+                    self.valid = False
+                self.row_used[CELL_ROW[k]] |= bit
+                self.col_used[CELL_COL[k]] |= bit
+                self.block_used[CELL_BLOCK[k]] |= bit
+
+        self.cands = [self.PossibleMask(k) for k in range(81)]
+
+    def PossibleMask(self, k):
+        """ Mask of values that could go in cell k given the filled cells """
+        value = self.cells[k]
+        if value:
+            return DIGIT_BITS[value]
+        return ALL_CANDS & ~(self.row_used[CELL_ROW[k]] | self.col_used[CELL_COL[k]] | self.block_used[CELL_BLOCK[k]])
+
+    def GetMask(self, i, j):
+        return self.cands[9 * i + j]
+
+    def GetSet(self, i, j):
+        return set(MASK_SETS[self.cands[9 * i + j]])
+
+    def Intersect(self, cand_board):
+        """ Keep only candidates that are also in cand_board (9x9 list of sets), so candidates
+        previously removed are not added back """
+        for k, prev_mask in enumerate(CandBoardToMasks(cand_board)):
+            self.cands[k] &= prev_mask
+
+    def ToCandBoard(self):
+        """ Adapter to the 9x9 list of sets candidate board used by the model, controller and patterns """
+        return MasksToCandBoard(self.cands)
+
+    def ToBoard(self):
+        """ Return the cell values as a 9x9 list of lists """
+        return [self.cells[r:r + 9] for r in range(0, 81, 9)]
+
+    ###########################################################################
+    # Trail based changes
+
+    def Mark(self):
+        """ Position in the trail to return to with Undo() """
+        return len(self.trail), len(self.assigned)
+
+    def Assign(self, k, value):
+        """ Fill in cell k with value and remove value as a candidate from the cells peers.
+        Returns False if this leaves a peer with no candidates. """
+        bit = DIGIT_BITS[value]
+        cands = self.cands
+        trail = self.trail
+
+        self.cells[k] = value
+        self.assigned.append(k)
+        self.row_used[CELL_ROW[k]] |= bit
+        self.col_used[CELL_COL[k]] |= bit
+        self.block_used[CELL_BLOCK[k]] |= bit
+
+        trail.append((k, cands[k]))
+        cands[k] = bit
+
+        ok = True
+        for p in PEERS[k]:
+            mask = cands[p]
+            if mask & bit:
+                trail.append((p, mask))
+                mask &= ~bit
+                cands[p] = mask
+                if not mask:
+                    ok = False
+        return ok
+
+    def Eliminate(self, k, bits):
+        """ Remove the candidates in bits from cell k.  Returns False if this leaves the cell with no candidates. """
+        mask = self.cands[k]
+        if mask & bits:
+            self.trail.append((k, mask))
+            mask &= ~bits
+            self.cands[k] = mask
+        return mask != 0
+
+    def Undo(self, mark):
+        """ Unwind all changes made since mark was taken """
+        trail_mark, assigned_mark = mark
+        cands = self.cands
+        trail = self.trail
+        cells = self.cells
+        assigned = self.assigned
+
+        while len(assigned) > assigned_mark:
+            k = assigned.pop()
+            not_bit = ~DIGIT_BITS[cells[k]]
+            cells[k] = 0
+            self.row_used[CELL_ROW[k]] &= not_bit
+            self.col_used[CELL_COL[k]] &= not_bit
+            self.block_used[CELL_BLOCK[k]] &= not_bit
+
+        while len(trail) > trail_mark:
+            k, mask = trail.pop()
+            cands[k] = mask
+
+    ###########################################################################
+    # Constraint propagation
+
+    def Propagate(self, units=None, hidden=True):
+        """ Fill in naked singles (cells with one candidate) and, if hidden is True, hidden singles (digits
+        with one possible cell in a unit) until there are none left.  Uses a worklist so only the cells and
+        units changed by each placement are looked at again.  All changes are made with Assign() so can be
+        undone.
+        units - the units (0-26, see sudoku_coords) to check for hidden singles to start with, None checks
+                them all.  Cells with a single candidate are always found.
+        Returns (num_naked, num_hidden) singles placed, or None if a cell or unit is left with no options,
+        in which case the state should be undone. """
+        cells, cands, trail = self.cells, self.cands, self.trail
+        bit_count, bit_digit = BIT_COUNT, BIT_DIGIT
+
+        singles = [k for k in range(81) if not cells[k] and bit_count[cands[k]] <= 1]
+        pending = set(range(27)) if units is None else set(units)
+        num_naked = num_hidden = 0
+
+        while singles or (hidden and pending):
+            if singles:
+                k = singles.pop()
+                if cells[k]:
+                    continue
+                mask = cands[k]
+                if not mask:
+                    return None
+                value = bit_digit[mask]
+                num_naked += 1
+            else:
+                # Look for hidden singles in a unit, found as digits seen in exactly one empty cell
+                u = pending.pop()
+                unit = UNITS[u]
+                placed = once = twice = 0
+                for k in unit:
+                    if cells[k]:
+                        placed |= DIGIT_BITS[cells[k]]
+                    else:
+                        twice |= once & cands[k]
+                        once |= cands[k]
+                if (once | placed) != ALL_CANDS:
+                    return None  # A digit has nowhere to go in this unit
+                hidden_bits = once & ~twice & ~placed
+                if not hidden_bits:
+                    continue
+
+                # Place the lowest one and check the unit again for any others
+                bit = hidden_bits & -hidden_bits
+                if hidden_bits != bit:
+                    pending.add(u)
+                k = next(c for c in unit if not cells[c] and cands[c] & bit)
+                value = bit_digit[bit]
+                num_hidden += 1
+
+            start = len(trail)
+            if not self.Assign(k, value):
+                return None
+
+            # The cell's own units lost its other candidates, which can leave a digit one place in them
+            if hidden:
+                pending.update(CELL_UNITS[k])
+
+            # Queue up the peers that lost a candidate
+            for p, _ in trail[start + 1:]:
+                if bit_count[cands[p]] == 1:
+                    singles.append(p)
+                if hidden:
+                    pending.update(CELL_UNITS[p])
+
+        return num_naked, num_hidden
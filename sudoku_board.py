@@ -0,0 +1,91 @@
+import sudoku as sd
+
+###############################################################################
+# Compact immutable board
+#
+# A Board holds the 81 cell values row by row in a bytes object, 0 for an
+# empty cell.  It is hashable so can be used as a dict key or in a set, and a
+# board with a changed cell is a cheap copy of 81 bytes.
+
+# Translation tables between the cell values 0-9 and the 81 character string format
+_TO_STRING = bytes.maketrans(bytes(range(10)), b'0123456789')
+_FROM_STRING = bytes.maketrans(b'0123456789.*_', bytes(range(10)) + bytes(3))
+
+
+class Board:
+    """ Immutable sudoku board.  Can be read like the 9x9 list of lists boards used elsewhere, ie board[i][j],
+    or converted to one with ToList(). """
+    __slots__ = ('cells',)
+
+    def __init__(self, board=None):
+        """ board - a 9x9 list of lists of ints, 81 bytes of cell values or another Board.  None gives an
+        empty board. """
+        if board is None:
+            cells = bytes(81)
+        elif isinstance(board, Board):
+            cells = board.cells
+        elif isinstance(board, (bytes, bytearray)):
+            cells = bytes(board)
+        else:
+            cells = bytes(value for row in board for value in row)
+
+        if len(cells) != 81 or max(cells) > 9:
+            raise ValueError('A board needs 81 cells with values 0-9')
+        object.__setattr__(self, 'cells', cells)
+
+    @classmethod
+    def FromString(cls, str_board):
+        """ Board from a string of 81 numbers with blanks as 0, *, _ or '.'.  Returns None if the string is
+        not in that format. """
+        if not sd.BOARD_STRING_REGEX.fullmatch(str_board):
+            return None
+        return cls(str_board.encode('ascii').translate(_FROM_STRING))
+
+    def ToString(self):
+        """ String of 81 numbers with blanks as 0 """
+        return self.cells.translate(_TO_STRING).decode('ascii')
+
+    def ToList(self):
+        """ New 9x9 list of lists of ints """
+        cells = self.cells
+        return [list(cells[r:r + 9]) for r in range(0, 81, 9)]
+
+    def GetCell(self, i, j):
+        return self.cells[9 * i + j]
+
+    def WithCell(self, i, j, value):
+        """ Copy of this board with cell (i,j) set to value """
+        cells = bytearray(self.cells)
+        cells[9 * i + j] = value
+        return Board(cells)
+
+    def NumFilled(self):
+        return 81 - self.cells.count(0)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Board is immutable')
+
+    def __getitem__(self, i):
+        """ Row i as bytes, so board[i][j] gives the value of cell (i,j) """
+        return self.cells[9 * i:9 * i + 9]
+
+    def __iter__(self):
+        cells = self.cells
+        return (cells[r:r + 9] for r in range(0, 81, 9))
+
+    def __len__(self):
+        return 9
+
+    def __eq__(self, other):
+        if isinstance(other, Board):
+            return self.cells == other.cells
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.cells)
+
+    def __repr__(self):
+        return "Board('" + self.ToString() + "')"
+
+    def __reduce__(self):
+        return Board, (self.cells,)
@@ -0,0 +1,91 @@
+from collections import OrderedDict
+
+import sudoku as sd
+from sudoku_board import Board
+from sudoku_canon import ApplyTransform, CanonicalForm, InverseTransform
+
+###############################################################################
+# LRU cache of solver results
+#
+# Results are keyed on the board, held as a Board so any of the string or
+# list forms of the same puzzle share an entry, plus the solver backend and
+# options since these change the count returned (eg max_solutions).  The
+# solution is stored as an immutable Board and handed back as a new list of
+# lists so callers can't change the cached copy.
+#
+# With canonical set the board is first reduced to its canonical form (see
+# sudoku_canon), so all the symmetric variants of a puzzle share one entry and
+# the cached solution is mapped back to each variant.
+
+
+class SolutionCache:
+    def __init__(self, maxsize=1024, canonical=False):
+        """ maxsize   - number of results kept, the least recently used is dropped when full
+        canonical - key on the canonical form of the board so equivalent puzzles share an entry """
+        self.maxsize = maxsize
+        self.canonical = canonical
+        self.hits = 0
+        self.misses = 0
+        self.results = OrderedDict()
+
+    @staticmethod
+    def Key(board, backend='backtrack', **options):
+        """ Cache key for solving board with the given backend and options.  Lists in the options are
+        converted to tuples so they can be hashed. """
+        return (Board(board), backend,
+                tuple(sorted((name, tuple(value) if isinstance(value, list) else value)
+                             for name, value in options.items())))
+
+    def Get(self, key):
+        """ (num_solns, soln_board) for the key or None if not cached """
+        result = self.results.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.results.move_to_end(key)
+        num_solns, soln = result
+        return num_solns, None if soln is None else soln.ToList()
+
+    def Put(self, key, num_solns, soln_board):
+        self.results[key] = (num_solns, None if soln_board is None else Board(soln_board))
+        self.results.move_to_end(key)
+        while len(self.results) > self.maxsize:
+            self.results.popitem(last=False)
+
+    def Solve(self, board, backend='backtrack', stats=None, **options):
+        """ sudoku.Solve with the result cached.  stats is only filled in when the solver is run. """
+        transform = None
+        if self.canonical:
+            board, transform = CanonicalForm(board)
+
+        key = self.Key(board, backend, **options)
+        result = self.Get(key)
+        if result is None:
+            result = sd.Solve(board, backend, stats=stats, **options)
+            self.Put(key, *result)
+
+        if transform is not None and result[1] is not None:
+            result = result[0], ApplyTransform(result[1], InverseTransform(transform))
+        return result
+
+    def Invalidate(self, board):
+        """ Remove all cached results for a board, returns the number removed """
+        board = CanonicalForm(board)[0] if self.canonical else Board(board)
+        keys = [key for key in self.results if key[0] == board]
+        for key in keys:
+            del self.results[key]
+        return len(keys)
+
+    def Clear(self):
+        """ Remove all cached results and reset the hit and miss counts """
+        self.results.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.results)
+
+    def __contains__(self, key):
+        return key in self.results
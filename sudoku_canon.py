@@ -0,0 +1,190 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import permutations, product
+
+from sudoku_board import Board
+
+###############################################################################
+# Canonical form of a puzzle under the sudoku symmetry group
+#
+# Two puzzles are equivalent if one can be turned into the other by any mix of
+# transposition, permuting the bands (and stacks), permuting the rows within a
+# band (and columns within a stack) and relabelling the digits.
+#
+# The canonical form is the equivalent board that is smallest when compared a
+# row at a time, first on the pattern of filled cells in the row (as a 9 bit
+# number with column 0 as the top bit) then on its digits, relabelled in order
+# of first appearance on the board.  This lets the search build the board a
+# row at a time, keeping only the row and column orders tied for the smallest
+# board so far.  The pattern comparison cuts the 1296 column orders down
+# before any digits are compared.  Its result for a set of tied column orders
+# and a row pattern is cached, with the orders that are left grouped by the
+# order they put the filled columns in, so the digits are relabelled once
+# per group rather than once per column order.
+
+
+@dataclass(frozen=True)
+class Transform:
+    """ Maps board to new_board as new_board[i][j] = digits[src[rows[i]][cols[j]]] where src is the board,
+    or its transpose if transpose is True """
+    transpose: bool
+    rows: tuple
+    cols: tuple
+    digits: tuple       # Indexed by the old value, digits[0] is 0
+
+
+def _LinePermutations():
+    """ The 1296 orders of rows (or columns) that keep the bands (stacks) together """
+    triples = list(permutations(range(3)))
+    return [tuple(3 * band + within[q][k] for q, band in enumerate(bands) for k in range(3))
+            for bands in triples for within in product(triples, repeat=3)]
+
+
+LINE_PERMS = _LinePermutations()
+
+
+def _MaskTables(perm):
+    """ Lookup tables giving the row mask after reordering the columns by perm, one table for each stack of
+    the original mask indexed by the 3 bits of that stack.  Column 0 is the top bit of a mask. """
+    tables = [[0] * 8 for _ in range(3)]
+    for new_col, old_col in enumerate(perm):
+        stack, bit = divmod(old_col, 3)
+        for bits in range(8):
+            if bits & (4 >> bit):
+                tables[stack][bits] |= 256 >> new_col
+    return tables
+
+
+MASK_TABLES = [_MaskTables(perm) for perm in LINE_PERMS]
+
+
+def _PermuteMask(p, mask):
+    t0, t1, t2 = MASK_TABLES[p]
+    return t0[mask >> 6] | t1[(mask >> 3) & 7] | t2[mask & 7]
+
+
+ALL_PERMS = tuple(range(len(LINE_PERMS)))
+
+
+@lru_cache(maxsize=8192)
+def _MinPerms(perms, mask):
+    """ Smallest mask after reordering the columns of a row mask by any of the column orders perms (None for
+    all of them), and the orders giving it grouped by the order they put the filled columns in, as a tuple
+    of (filled columns, column orders).  Orders in a group give the same digits for any row with this
+    mask. """
+    if perms is None:
+        perms = ALL_PERMS
+    values = [_PermuteMask(p, mask) for p in perms]
+    best = min(values)
+
+    groups = {}
+    for p, value in zip(perms, values):
+        if value == best:
+            filled = tuple(j for j in LINE_PERMS[p] if mask & (256 >> j))
+            groups.setdefault(filled, []).append(p)
+    return best, tuple((filled, tuple(group)) for filled, group in groups.items())
+
+
+def _NextRows(rows):
+    """ Rows that can come next after the given row order, keeping bands together """
+    if len(rows) % 3:
+        band = rows[-1] // 3
+        return [r for r in range(3 * band, 3 * band + 3) if r not in rows]
+    used_bands = {r // 3 for r in rows}
+    return [r for r in range(9) if r // 3 not in used_bands]
+
+
+def _RowMasks(board):
+    masks = []
+    for row in board:
+        mask = 0
+        for value in row:
+            mask = mask << 1 | (value != 0)
+        masks.append(mask)
+    return masks
+
+
+def _RelabelRow(row, filled, labels):
+    """ Digits of the filled cells in a row, given in order by filled, relabelled, and the labels after any
+    new digits are given the next free label """
+    labels = list(labels)
+    next_label = max(labels) + 1
+    digits = []
+    for j in filled:
+        value = row[j]
+        if not labels[value]:
+            labels[value] = next_label
+            next_label += 1
+        digits.append(labels[value])
+    return tuple(digits), tuple(labels)
+
+
+def CanonicalForm(board):
+    """ Canonical form of a board, as a Board, and the Transform that maps the board to it.  Boards with
+    very few filled cells are slow as nearly every transform ties until the last rows. """
+    sources = [[list(row) for row in board], [list(col) for col in zip(*board)]]
+    masks = [_RowMasks(src) for src in sources]
+
+    # Build the row order a row at a time, keeping the states that give the smallest board so far.  Each
+    # state is (transposed, rows so far, column orders still tied, digit labels so far).
+    states = [(t, (), None, (0,) * 10) for t in (0, 1)]
+    for _ in range(9):
+        # Compare on the pattern of filled cells first
+        candidates = []
+        best_value = 512
+        for t, rows, perms, labels in states:
+            for r in _NextRows(rows):
+                value, kept = _MinPerms(perms, masks[t][r])
+                if value <= best_value:
+                    best_value = value
+                    candidates.append((value, t, rows + (r,), perms, kept, labels))
+
+        # Then on the relabelled digits.  Column orders giving the same digits can still label the digits
+        # differently so are split into separate states.
+        best_digits = None
+        states = []
+        for value, t, rows, perms, kept, labels in candidates:
+            if value != best_value:
+                continue
+            if not value:
+                states.append((t, rows, perms, labels))
+                continue
+
+            relabelled = [(_RelabelRow(sources[t][rows[-1]], filled, labels), group) for filled, group in kept]
+            digits = min(d for (d, _), _ in relabelled)
+            if best_digits is None or digits < best_digits:
+                best_digits = digits
+                states = []
+            if digits == best_digits:
+                groups = {}
+                for (d, new_labels), group in relabelled:
+                    if d == digits:
+                        groups.setdefault(new_labels, []).extend(group)
+                states += [(t, rows, tuple(group), new_labels) for new_labels, group in groups.items()]
+
+    t, rows, perms, labels = states[0]
+
+    # Digits not on the board take the remaining labels so the transform can be inverted
+    unused = iter(range(max(labels) + 1, 10))
+    digits = tuple(labels[n] if labels[n] or n == 0 else next(unused) for n in range(10))
+
+    transform = Transform(bool(t), rows, LINE_PERMS[perms[0] if perms else 0], digits)
+    return Board(ApplyTransform(board, transform)), transform
+
+
+def ApplyTransform(board, transform):
+    """ New 9x9 list of lists board given by applying the transform to a board """
+    src = [list(col) for col in zip(*board)] if transform.transpose else board
+    digits = transform.digits
+    return [[digits[src[i][j]] for j in transform.cols] for i in transform.rows]
+
+
+def InverseTransform(transform):
+    """ Transform that undoes the given one, eg to map the solution of a canonical board back to the
+    original board """
+    rows = tuple(sorted(range(9), key=transform.rows.__getitem__))
+    cols = tuple(sorted(range(9), key=transform.cols.__getitem__))
+    digits = tuple(sorted(range(10), key=transform.digits.__getitem__))
+    if transform.transpose:
+        return Transform(True, cols, rows, digits)
+    return Transform(False, rows, cols, digits)
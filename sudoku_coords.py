@@ -52,4 +52,42 @@ def GetBlockCells_BlockID(board, b):
 
 def GetBlockCells_CellID(board, i, j):
     b = GetBlockIDFromCellCoords(i, j)
-    return GetBlockCells_BlockID(board, b)
\ No newline at end of file
+    return GetBlockCells_BlockID(board, b)
+
+
+###############################################################################
+# Precomputed geometry tables
+#
+# Cells are also labelled by a flat index k = 9*i + j.  Units are numbered
+# 0-8 for rows, 9-17 for columns and 18-26 for blocks.  Cells within a block
+# unit are ordered as in GetCellCoordsFromBlockID.
+
+ROW_UNIT, COL_UNIT, BLOCK_UNIT = 0, 9, 18
+
+ROW_COORDS = tuple(tuple(GetCellCoordsFromRowID(r, k) for k in range(9)) for r in range(9))
+COL_COORDS = tuple(tuple(GetCellCoordsFromColID(c, k) for k in range(9)) for c in range(9))
+BLOCK_COORDS = tuple(tuple(GetCellCoordsFromBlockID(b, k) for k in range(9)) for b in range(9))
+
+# The 27 units as tuples of (i,j) coords and as tuples of flat indices
+UNIT_COORDS = ROW_COORDS + COL_COORDS + BLOCK_COORDS
+UNITS = tuple(tuple(9 * i + j for i, j in unit) for unit in UNIT_COORDS)
+UNIT_IDS = {unit: u for u, unit in enumerate(UNIT_COORDS)}
+
+# Row, column and block of each flat cell index, and the 3 units (row, column, block) each cell belongs to
+CELL_ROW = tuple(k // 9 for k in range(81))
+CELL_COL = tuple(k % 9 for k in range(81))
+CELL_BLOCK = tuple(GetBlockIDFromCellCoords(k // 9, k % 9) for k in range(81))
+CELL_UNITS = tuple((ROW_UNIT + CELL_ROW[k], COL_UNIT + CELL_COL[k], BLOCK_UNIT + CELL_BLOCK[k]) for k in range(81))
+
+# The 20 cells sharing a row, column or block with each cell
+PEERS = tuple(tuple(sorted(set(UNITS[CELL_UNITS[k][0]] + UNITS[CELL_UNITS[k][1]] + UNITS[CELL_UNITS[k][2]]) - {k}))
+              for k in range(81))
+PEER_COORDS = tuple(tuple(divmod(p, 9) for p in peers) for peers in PEERS)
+
+# Cells shared by each pair of units, eg INTERSECTIONS[u1][u2] for a block and a row crossing it is the 3 cells
+# of the row in that block.  Empty for units that do not intersect.
+INTERSECTIONS = tuple(tuple(tuple(k for k in UNITS[u1] if k in UNITS[u2]) for u2 in range(27)) for u1 in range(27))
+
+# The 3 rows and 3 columns crossing each block, as unit numbers
+BLOCK_LINES = tuple(tuple(u for u in range(BLOCK_UNIT) if len(INTERSECTIONS[BLOCK_UNIT + b][u]) == 3)
+                    for b in range(9))
@@ -0,0 +1,170 @@
+import sudoku_coords as sdc
+
+###############################################################################
+# Dancing Links (Algorithm X) exact cover solver
+#
+# Each of the 729 options (cell, value) covers 4 of the 324 constraints:
+#   0-80    cell (i,j) is filled
+#   81-161  row i contains value n
+#   162-242 column j contains value n
+#   243-323 block b contains value n
+# The matrix is held as a set of parallel lists giving the left, right, up,
+# down and column header of each node.  Node 0 is the root, nodes 1-324 are the
+# column headers and the 4 nodes of option o are 325 + 4*o to 328 + 4*o.
+
+NUM_COLUMNS = 324
+NUM_OPTIONS = 729
+FIRST_OPTION_NODE = NUM_COLUMNS + 1
+
+
+def OptionID(i, j, n):
+    """ Option for value n in cell (i,j) """
+    return 81 * i + 9 * j + n - 1
+
+
+def OptionColumns(option):
+    """ The 4 constraint columns (1-324) covered by an option """
+    cell, n = divmod(option, 9)
+    return 1 + cell, 82 + 9 * sdc.CELL_ROW[cell] + n, 163 + 9 * sdc.CELL_COL[cell] + n, \
+        244 + 9 * sdc.CELL_BLOCK[cell] + n
+
+
+def _BuildLinks():
+    """ Build the full exact cover matrix for an empty board """
+    num_nodes = FIRST_OPTION_NODE + 4 * NUM_OPTIONS
+    left, right, up, down, col = [list(range(num_nodes)) for _ in range(5)]
+    size = [0] * (NUM_COLUMNS + 1)
+
+    # Header ring
+    for c in range(NUM_COLUMNS + 1):
+        left[c] = c - 1 if c > 0 else NUM_COLUMNS
+        right[c] = c + 1 if c < NUM_COLUMNS else 0
+
+    for option in range(NUM_OPTIONS):
+        first = FIRST_OPTION_NODE + 4 * option
+        for k, c in enumerate(OptionColumns(option)):
+            node = first + k
+            # Ring of the 4 nodes in this option
+            left[node] = first + (k - 1) % 4
+            right[node] = first + (k + 1) % 4
+            # Append to the bottom of column c
+            col[node] = c
+            up[node] = up[c]
+            down[node] = c
+            down[up[c]] = node
+            up[c] = node
+            size[c] += 1
+
+    return left, right, up, down, col, size
+
+
+_LINKS = _BuildLinks()
+
+
+def SolvewDLX(board, max_solutions=None, stats=None):
+    """ Solve the puzzle as an exact cover problem with Dancing Links.
+    Returns (num_solns, soln_board) like sudoku.SolvewBacktrack, with soln_board the first solution found.
+    max_solutions - stop once this many solutions are found, None counts them all
+    stats         - optional sudoku_search.SearchStats, the nodes, backtracks and depth are filled in """
+    left, right, up, down, col, size = [list(links) for links in _LINKS]
+
+    def cover(c):
+        right[left[c]] = right[c]
+        left[right[c]] = left[c]
+        i = down[c]
+        while i != c:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                size[col[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def uncover(c):
+        i = up[c]
+        while i != c:
+            j = left[i]
+            while j != i:
+                size[col[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[c]] = c
+        left[right[c]] = c
+
+    # Remove the columns covered by the filled in cells
+    covered = set()
+    for i in range(9):
+        for j in range(9):
+            if board[i][j]:
+                columns = OptionColumns(OptionID(i, j, board[i][j]))
+                if covered.intersection(columns):
+                    return 0, None  # Duplicate value
+                covered.update(columns)
+                for c in columns:
+                    cover(c)
+
+    chosen = []
+    first_soln = []
+
+    def search(limit):
+        """ Algorithm X, returns the number of solutions found below this point """
+        if stats is not None:
+            stats.Visit(len(chosen))
+
+        c = right[0]
+        if c == 0:
+            if not first_soln:
+                first_soln.extend(chosen)
+            return 1
+
+        # Choose the column with fewest options
+        best, best_size = c, size[c]
+        c = right[c]
+        while c and best_size > 1:
+            if size[c] < best_size:
+                best, best_size = c, size[c]
+            c = right[c]
+        if best_size == 0:
+            return 0
+
+        num_solns = 0
+        cover(best)
+        r = down[best]
+        while r != best:
+            chosen.append(r)
+            j = right[r]
+            while j != r:
+                cover(col[j])
+                j = right[j]
+
+            num_solns_loop = search(None if limit is None else limit - num_solns)
+            num_solns += num_solns_loop
+
+            j = left[r]
+            while j != r:
+                uncover(col[j])
+                j = left[j]
+            chosen.pop()
+
+            if stats is not None and not num_solns_loop:
+                stats.backtracks += 1
+            if limit is not None and num_solns >= limit:
+                break
+            r = down[r]
+        uncover(best)
+
+        return num_solns
+
+    num_solns = search(max_solutions)
+    if num_solns == 0:
+        return 0, None
+
+    soln_board = [list(row) for row in board]
+    for node in first_soln:
+        cell, n = divmod((node - FIRST_OPTION_NODE) // 4, 9)
+        soln_board[cell // 9][cell % 9] = n + 1
+
+    return num_solns, soln_board
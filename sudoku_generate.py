@@ -0,0 +1,164 @@
+import argparse
+import random
+import sys
+from dataclasses import dataclass
+from functools import partial
+from multiprocessing import Pool
+
+import sudoku as sd
+
+###############################################################################
+# Puzzle generator
+#
+# A random solution grid is made by filling the three diagonal blocks (which
+# don't share a row or column) with shuffled digits and solving the rest.
+# Clues are then removed in random order, a symmetry orbit at a time, keeping
+# any whose removal would leave more than one solution.  The uniqueness check
+# stops the search at the second solution found.
+#
+# Each puzzle is made from its own seed, base seed + index, so the output
+# is the same whatever the number of worker processes.
+
+# Solver options for the uniqueness check
+UNIQUE_OPTIONS = {'mode': 'propagate', 'branching': 'mrv', 'max_solutions': 2}
+
+
+def _Orbit(symmetry, i, j):
+    """ Cells that must be filled or emptied together with (i,j) to keep the clue pattern symmetric """
+    if symmetry == 'rotational':
+        cells = [(i, j), (8 - i, 8 - j)]
+    elif symmetry == 'mirror':
+        cells = [(i, j), (i, 8 - j)]
+    elif symmetry == 'diagonal':
+        cells = [(i, j), (j, i)]
+    elif symmetry == 'dihedral':
+        # The 90 degree rotations and their reflections
+        cells = [(i, j), (j, 8 - i), (8 - i, 8 - j), (8 - j, i), (j, i), (i, 8 - j), (8 - i, j), (8 - j, 8 - i)]
+    else:
+        cells = [(i, j)]
+    return tuple(sorted(set(cells)))
+
+
+SYMMETRIES = ['none', 'rotational', 'mirror', 'diagonal', 'dihedral']
+
+# Sorted list of the distinct orbits of the 81 cells for each symmetry
+SYMMETRY_ORBITS = {symmetry: sorted({_Orbit(symmetry, i, j) for i in range(9) for j in range(9)})
+                   for symmetry in SYMMETRIES}
+
+
+@dataclass
+class GeneratedPuzzle:
+    seed: int
+    puzzle: str
+    solution: str
+    num_clues: int
+
+
+def RandomSolution(rng):
+    """ Random complete board using the random.Random rng """
+    board = [[0] * 9 for _ in range(9)]
+    for b in range(3):
+        digits = list(range(1, 10))
+        rng.shuffle(digits)
+        for n, value in enumerate(digits):
+            board[3 * b + n // 3][3 * b + n % 3] = value
+
+    return sd.Solve(board, **dict(UNIQUE_OPTIONS, max_solutions=1))[1]
+
+
+def HasUniqueSolution(board):
+    return sd.Solve(board, **UNIQUE_OPTIONS)[0] == 1
+
+
+def RemoveClues(solution, rng, symmetry='none', min_clues=17):
+    """ Remove clues from a solution board in random order while the solution stays unique, and the number
+    of clues stays at or above min_clues.  Returns the new board. """
+    board = [list(row) for row in solution]
+    num_clues = 81
+
+    orbits = list(SYMMETRY_ORBITS[symmetry])
+    rng.shuffle(orbits)
+
+    for orbit in orbits:
+        if num_clues - len(orbit) < min_clues:
+            continue
+
+        for i, j in orbit:
+            board[i][j] = 0
+
+        if HasUniqueSolution(board):
+            num_clues -= len(orbit)
+        else:
+            for i, j in orbit:
+                board[i][j] = solution[i][j]
+
+    return board
+
+
+def GeneratePuzzle(seed=None, symmetry='none', min_clues=17, max_clues=81, max_attempts=100):
+    """ Generate a puzzle with a unique solution, returns a GeneratedPuzzle or None if no puzzle with at
+    most max_clues was found in max_attempts solution grids.
+    seed      - seed for the random numbers, None for a random puzzle
+    symmetry  - one of SYMMETRIES, the pattern of clues is kept symmetric under it
+    min_clues - stop removing clues at this number """
+    if symmetry not in SYMMETRY_ORBITS:
+        raise ValueError('Unknown symmetry ' + str(symmetry))
+
+    rng = random.Random(seed)
+    for _ in range(max_attempts):
+        solution = RandomSolution(rng)
+        board = RemoveClues(solution, rng, symmetry, min_clues)
+
+        num_clues = sum(1 for row in board for value in row if value)
+        if num_clues <= max_clues:
+            return GeneratedPuzzle(seed, sd.BoardToString(board), sd.BoardToString(solution), num_clues)
+
+    return None
+
+
+def GeneratePuzzles(count, seed=0, processes=None, chunksize=4, **options):
+    """ Generate count puzzles, yielding a GeneratedPuzzle (or None, see GeneratePuzzle) for each in order.
+    Puzzle n uses the seed seed + n.
+    processes - number of worker processes, None uses all cores and 1 generates in this process
+    chunksize - number of puzzles sent to a worker at a time
+    Other options are passed to GeneratePuzzle eg symmetry. """
+    generate_func = partial(GeneratePuzzle, **options)
+    seeds = range(seed, seed + count)
+
+    if processes == 1:
+        yield from map(generate_func, seeds)
+        return
+
+    with Pool(processes) as pool:
+        yield from pool.imap(generate_func, seeds, chunksize)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate sudoku puzzles with unique solutions, one 81 character '
+                                                 'puzzle per line.')
+    parser.add_argument('count', type=int, help='number of puzzles')
+    parser.add_argument('-o', '--output', default='-', help='puzzle file, - for stdout')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='seed of the first puzzle')
+    parser.add_argument('-p', '--processes', type=int, default=None, help='worker processes, default all cores')
+    parser.add_argument('-c', '--chunksize', type=int, default=4, help='puzzles sent to a worker at a time')
+    parser.add_argument('--symmetry', default='none', choices=SYMMETRIES, help='symmetry of the clue pattern')
+    parser.add_argument('--min-clues', type=int, default=17, help='stop removing clues at this number')
+    parser.add_argument('--max-clues', type=int, default=81, help='discard puzzles with more clues')
+    parser.add_argument('--solutions', action='store_true', help='write puzzle,solution on each line')
+    args = parser.parse_args(argv)
+
+    out_file = sys.stdout if args.output == '-' else open(args.output, 'w')
+
+    try:
+        for result in GeneratePuzzles(args.count, args.seed, args.processes, args.chunksize,
+                                      symmetry=args.symmetry, min_clues=args.min_clues, max_clues=args.max_clues):
+            if result is None:
+                continue
+            out_file.write(result.puzzle + (',' + result.solution if args.solutions else '') + '\n')
+    finally:
+        if out_file is not sys.stdout:
+            out_file.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import numpy as np
+
+###############################################################################
+# Vectorised candidate and validity code for batches of boards
+#
+# Boards are held as an (N, 9, 9) int array with 0 as an empty cell.  Each
+# function is a batched counterpart of the list based code in sudoku.py,
+# written with whole array operations rather than per cell loops.
+# Requires numpy, installed with the numpy extra, which the GUI does not.
+
+DIGITS = np.arange(1, 10)
+
+
+def BoardsFromStrings(str_boards):
+    """ Convert a sequence of 81 character board strings (blanks as 0, *, _ or '.') into an (N, 9, 9) array """
+    table = str.maketrans('._*', '000')
+    data = ''.join(s.translate(table) for s in str_boards).encode('ascii')
+    return (np.frombuffer(data, dtype=np.uint8) - ord('0')).reshape(-1, 9, 9).astype(np.int8)
+
+
+def OneHot(boards):
+    """ (N, 9, 9, 9) bool array, True at [b, i, j, n-1] if cell (i,j) of board b holds n """
+    return np.asarray(boards)[..., None] == DIGITS
+
+
+def _BlockView(onehot):
+    """ View an (N, 9, 9, 9) array as (N, 3, 3, 3, 3, 9) indexed by [b, block row, row in block,
+    block col, col in block, digit] """
+    return onehot.reshape(-1, 3, 3, 3, 3, 9)
+
+
+def BatchCandidates(boards):
+    """ Batched sudoku.SolveCandidates.  Returns an (N, 9, 9, 9) bool array, True at [b, i, j, n-1] if
+    n is a candidate for cell (i,j) of board b.  Known cells have only their own value as a candidate. """
+    onehot = OneHot(boards)
+
+    row_used = onehot.any(axis=2)                              # (N, 9 rows, 9 digits)
+    col_used = onehot.any(axis=1)                              # (N, 9 cols, 9 digits)
+    block_used = _BlockView(onehot).any(axis=(2, 4))           # (N, 3, 3, 9 digits)
+
+    used = row_used[:, :, None, :] | col_used[:, None, :, :]
+    used = used | np.repeat(np.repeat(block_used, 3, axis=1), 3, axis=2)
+
+    empty = (np.asarray(boards) == 0)[..., None]
+    return np.where(empty, ~used, onehot)
+
+
+def BatchFindDuplicates(boards):
+    """ Batched sudoku.FindDuplicates.  Returns (valid, duplicates) where valid is an (N,) bool array and
+    duplicates an (N, 9, 9) bool array, True for cells whose value is repeated in their row, column or block """
+    onehot = OneHot(boards)
+
+    row_counts = onehot.sum(axis=2, dtype=np.int8)             # (N, 9 rows, 9 digits)
+    col_counts = onehot.sum(axis=1, dtype=np.int8)             # (N, 9 cols, 9 digits)
+    block_counts = _BlockView(onehot).sum(axis=(2, 4), dtype=np.int8)
+
+    repeated = (row_counts[:, :, None, :] > 1) | (col_counts[:, None, :, :] > 1)
+    repeated = repeated | np.repeat(np.repeat(block_counts > 1, 3, axis=1), 3, axis=2)
+
+    duplicates = (onehot & repeated).any(axis=3)
+    valid = ~duplicates.any(axis=(1, 2))
+    return valid, duplicates
+
+
+def BatchNakedSingles(boards, cands=None):
+    """ (N, 9, 9) bool array of empty cells with exactly one candidate, and (N,) bool array of boards with an
+    empty cell that has no candidates (so no solution) """
+    if cands is None:
+        cands = BatchCandidates(boards)
+    empty = np.asarray(boards) == 0
+    counts = cands.sum(axis=3)
+    return empty & (counts == 1), (empty & (counts == 0)).any(axis=(1, 2))
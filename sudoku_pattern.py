@@ -1,6 +1,7 @@
+from array import array
 from dataclasses import dataclass
-from sudoku_coords import GetRowCells, GetColCells, GetBlockCells_BlockID, GetCellCoordsFromBlockID, \
-                            GetBlockIDFromCellCoords, GetCellCoordsFromColID, GetCellCoordsFromRowID
+from sudoku_bitmask import BIT_COUNT, DIGIT_BITS, MASK_DIGITS, MASK_SETS, SetToMask
+from sudoku_coords import ROW_COORDS, COL_COORDS, BLOCK_COORDS, CELL_BLOCK, UNIT_COORDS, UNIT_IDS
 
 ###############################################################################
 
@@ -12,192 +13,298 @@ class PatternInfo:
     candidates: {int}
 
 
-def FindHiddenSingle(board, cand_board, unit_func, coord_func):
+def UnitCells(board, unit):
+    """ Get the values (or candidates from a cand_board) of the cells in a unit given as a tuple of coords """
+    return [board[i][j] for i, j in unit]
+
+
+###############################################################################
+# Pattern results
+#
+# The finders below return a PatternResult rather than lists of PatternInfo,
+# so a search makes one array instead of an object and a set for each cell.
+# Each entry is a single int packing the cell index k = 9 * i + j, a 9 bit
+# candidate mask and whether the entry is part of the pattern (VALUE) or
+# candidates it removes (REMOVAL).  PatternInfo lists are only made by
+# ToPatternInfo() for the view.
+
+
+class PatternResult:
+    VALUE = 0
+    REMOVAL = 1
+
+    __slots__ = ('entries',)
+
+    def __init__(self, entries=()):
+        self.entries = array('L', entries)
+
+    def Add(self, k, mask, role=VALUE):
+        self.entries.append(role << 16 | mask << 7 | k)
+
+    def AddValue(self, i, j, mask):
+        self.entries.append(mask << 7 | 9 * i + j)
+
+    def AddRemoval(self, i, j, mask):
+        self.entries.append(1 << 16 | mask << 7 | 9 * i + j)
+
+    def Extend(self, other):
+        self.entries.extend(other.entries)
+        return self
+
+    __iadd__ = Extend
+
+    def __iter__(self):
+        """ Yield (k, mask, role) for each entry in the order added """
+        for entry in self.entries:
+            yield entry & 0x7F, (entry >> 7) & 0x1FF, entry >> 16
+
+    def Values(self):
+        """ Yield (k, mask) for the cells of the pattern """
+        for entry in self.entries:
+            if not entry >> 16:
+                yield entry & 0x7F, (entry >> 7) & 0x1FF
+
+    def Removals(self):
+        """ Yield (k, mask) for the candidates the pattern removes """
+        for entry in self.entries:
+            if entry >> 16:
+                yield entry & 0x7F, (entry >> 7) & 0x1FF
+
+    def ToPatternInfo(self):
+        """ (values, removal_values) as lists of PatternInfo """
+        values, removal_values = [], []
+        for k, mask, role in self:
+            (removal_values if role else values).append(PatternInfo(k // 9, k % 9, set(MASK_SETS[mask])))
+        return values, removal_values
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __eq__(self, other):
+        return isinstance(other, PatternResult) and self.entries == other.entries
+
+    def __repr__(self):
+        return 'PatternResult({})'.format(list(self))
+
+
+###############################################################################
+# Digit positions
+#
+# positions[u][n] is a 9 bit mask of the empty cells in unit u (numbered as
+# in sudoku_coords) that have n as a candidate, bit c for the c'th cell of
+# the unit.  It is built once for a board and candidates and shared by the
+# finders below, which would otherwise each search every unit for every
+# digit.
+
+# Cell indexes within a unit of the bits set in a position mask
+MASK_INDEXES = tuple(tuple(n - 1 for n in digits) for digits in MASK_DIGITS)
+
+
+def DigitPositions(board, cand_board, units=range(27), positions=None):
+    """ Build the positions masks for the given unit numbers, updating positions if given """
+    if positions is None:
+        positions = [None] * 27
+
+    for u in units:
+        unit_positions = [0] * 10
+        for c, (i, j) in enumerate(UNIT_COORDS[u]):
+            if board[i][j] == 0:
+                bit = 1 << c
+                for n in cand_board[i][j]:
+                    unit_positions[n] |= bit
+        positions[u] = unit_positions
+
+    return positions
+
+
+###############################################################################
+
+
+def FindHiddenSingle(board, cand_board, units, positions=None):
     """ Find if row, column or block has only 1 cell a particular number can
-    go into. """
-    values = []
+    go into.  units is a tuple of the units to search, each a tuple of cell coords. """
+    result = PatternResult()
+    if positions is None:
+        positions = DigitPositions(board, cand_board)
 
     # Search through 9 cell unit (row, column or block)
-    for u in range(0, 9):
-        cells = unit_func(board, u)
-        candsInUnit = unit_func(cand_board, u)
+    for unit in units:
+        unit_positions = positions[UNIT_IDS[unit]]
 
         # Loop through all possible numbers
         for n in range(1, 10):
-            idx = [c for c in range(0, 9) if cells[c] == 0 and n in candsInUnit[c]]
+            idx = MASK_INDEXES[unit_positions[n]]
 
             if len(idx) == 1:
-                i, j = coord_func(u, idx[0])
-                values.append(PatternInfo(i, j, {n}))
+                i, j = unit[idx[0]]
+                result.AddValue(i, j, DIGIT_BITS[n])
 
-    return values
+    return result
 
 
-def HiddenSingles(board, cand_board):
+def HiddenSingles(board, cand_board, positions=None):
     """ Find hidden singles, ie situations where a number has only one cell
     it can go in on a row, column or block """
+    if positions is None:
+        positions = DigitPositions(board, cand_board)
 
     # Rows
-    values = FindHiddenSingle(board, cand_board, GetRowCells, GetCellCoordsFromRowID)
+    result = FindHiddenSingle(board, cand_board, ROW_COORDS, positions)
     # Columns
-    values += FindHiddenSingle(board, cand_board, GetColCells, GetCellCoordsFromColID)
+    result += FindHiddenSingle(board, cand_board, COL_COORDS, positions)
     # Block
-    values += FindHiddenSingle(board, cand_board, GetBlockCells_BlockID, GetCellCoordsFromBlockID)
+    result += FindHiddenSingle(board, cand_board, BLOCK_COORDS, positions)
 
-    return values
+    return result
 
 
-def FindNakedPair(board, cand_board, unit_func, coord_func):
+def FindNakedPair(board, cand_board, units):
     """ Finds cells with just 2 candidates in a cell where that pattern is
     repeated  once in same row, block or column ie 1 2, 1 2
     Means same values cannot be in other cells along that row, block or column
+    This is the size 2 case of FindNakedSubset, found by matching equal masks rather than searching
+    combinations.
     """
-    values, removal_values = [], []
+    result = PatternResult()
 
-    # Search through 9 cell unit (row, column or block)
-    for u in range(0, 9):
-        pairs = []
-        pair_loc = []
+    for unit in units:
+        cands = UnitCells(cand_board, unit)
 
-        cells = unit_func(board, u)
-        cands = unit_func(cand_board, u)
-
-        # Loop through each cell of unit see if any pairs (cells with 2 cands)
-        for c in range(0, 9):
+        # Cells with just 2 candidates (so empty) matching the mask of an earlier cell are a naked pair
+        pair_cells = {}
+        pairs = []
+        for c in range(9):
             if len(cands[c]) == 2:
-                # Get the values of the pair (a,b) and record location (i,j)
-                it = iter(cands[c])
-                a, b = next(it), next(it)
-                i, j = coord_func(u, c)
+                mask = SetToMask(cands[c])
+                locs = pair_cells.setdefault(mask, [])
+                pairs += [(c1, c, mask) for c1 in locs]
+                locs.append(c)
 
-                # If match previously found pair we have a Naked Pair
-                for p, pair in enumerate(pairs):
-                    i1, j1 = pair_loc[p]
-                    if (a, b) == pair:
-                        this_pattern = [PatternInfo(i, j, {a, b}), PatternInfo(i1, j1, {a, b})]
-                        this_removals = RemovalCandidates(cells, cands, {a, b},
-                                                                lambda k: coord_func(u, k), [(i1, j1), (i, j)])
-                        if len(this_removals):
-                            values += this_pattern
-                            removal_values += this_removals
+        if not pairs:
+            continue
 
-                # Remember this pair
-                pairs += [(a, b)]
-                pair_loc += [(i, j)]
+        # Sorted to give the same order as FindNakedSubset
+        cells = UnitCells(board, unit)
+        pairs.sort()
+        for c1, c2, mask in pairs:
+            locs = [unit[c1], unit[c2]]
+            num_entries = len(result)
+            RemovalCandidates(cells, cands, set(MASK_SETS[mask]), unit, locs, result)
+            if len(result) > num_entries:
+                for i, j in locs:
+                    result.AddValue(i, j, mask)
 
-    return values, removal_values
+    return result
 
 
 def NakedPairs(board, cand_board):
     # Rows
-    values_row, removal_values_row = FindNakedPair(board, cand_board, GetRowCells, GetCellCoordsFromRowID)
-
+    result = FindNakedPair(board, cand_board, ROW_COORDS)
     # Columns
-    values_col, removal_values_col = FindNakedPair(board, cand_board, GetColCells, GetCellCoordsFromColID)
-
+    result += FindNakedPair(board, cand_board, COL_COORDS)
     # Blocks
-    values_block, removal_values_block = FindNakedPair(board, cand_board, GetBlockCells_BlockID, GetCellCoordsFromBlockID)
+    result += FindNakedPair(board, cand_board, BLOCK_COORDS)
 
-    return values_row + values_col + values_block, removal_values_row + removal_values_col + removal_values_block
+    return result
 
 
-def FindBoxLinePair(board, cand_board, unit_func, isRow):
+def FindBoxLinePair(board, cand_board, units, positions=None):
     """ Finds all box-line pairs in columns or rows.
     Box-line pair is when a particular number can only be in two cells on that row/column,
     both of which are in the same block.  Means can eliminate that candidate in
     that same block in other rows/columns. """
-    values, removal_values = [], []
+    result = PatternResult()
+    if positions is None:
+        positions = DigitPositions(board, cand_board)
 
     # Search through 9 cell unit (row or column)
-    for u in range(0, 9):
-        cells = unit_func(board, u)
-        candsInUnit = unit_func(cand_board, u)
+    for unit in units:
+        unit_positions = positions[UNIT_IDS[unit]]
 
         # Loop through all possible numbers
         for n in range(1, 10):
             # Find location of all candidates of value n
-            idx = [c for c in range(0, 9) if cells[c] == 0 and n in candsInUnit[c]]
+            idx = MASK_INDEXES[unit_positions[n]]
 
             # If only found number n twice in col or row and both in same block
             if len(idx) == 2 and idx[0] // 3 == idx[1] // 3:
-                if isRow:
-                    i1, j1, i2, j2 = u, idx[0], u, idx[1]
-                else:
-                    i1, j1, i2, j2 = idx[0], u, idx[1], u
-                this_pattern = [PatternInfo(i1, j1, {n}), PatternInfo(i2, j2, {n})]
+                (i1, j1), (i2, j2) = unit[idx[0]], unit[idx[1]]
 
                 # Mark candidates with value n in same block for removal
-                b = GetBlockIDFromCellCoords(i1, j1)
-                rcells = GetBlockCells_BlockID(board, b)
-                rcands = GetBlockCells_BlockID(cand_board, b)
+                block = BLOCK_COORDS[CELL_BLOCK[9 * i1 + j1]]
+                rcells = UnitCells(board, block)
+                rcands = UnitCells(cand_board, block)
+                num_entries = len(result)
+                RemovalCandidates(rcells, rcands, {n}, block, [(i1, j1), (i2, j2)], result)
 
-                def LocFunc(k):
-                    return GetCellCoordsFromBlockID(b, k)
-                this_removals = RemovalCandidates(rcells, rcands, {n}, LocFunc, [(i1, j1), (i2, j2)])
+                if len(result) > num_entries:
+                    result.AddValue(i1, j1, DIGIT_BITS[n])
+                    result.AddValue(i2, j2, DIGIT_BITS[n])
 
-                if len(this_removals):
-                    values += this_pattern
-                    removal_values += this_removals
+    return result
 
-    return values, removal_values
 
+def BoxLinePairs(board, cand_board, positions=None):
+    if positions is None:
+        positions = DigitPositions(board, cand_board)
 
-def BoxLinePairs(board, cand_board):
-    values_row, removal_values_row = FindBoxLinePair(board, cand_board, GetRowCells, isRow=True)
-    values_col, removal_values_col = FindBoxLinePair(board, cand_board, GetColCells, isRow=False)
+    result = FindBoxLinePair(board, cand_board, ROW_COORDS, positions)
+    result += FindBoxLinePair(board, cand_board, COL_COORDS, positions)
 
-    return values_row + values_col, removal_values_row + removal_values_col
+    return result
 
 
-def PointingPairs(board, cand_board):
+def FindPointingPair(board, cand_board, blocks, positions=None):
     """ Finds all pointing pairs in either rows or columns.
     Pointing pair is if the only 2 cells a particular number can go in a block
     happen to be in same row or column. Means can eliminate that number as
-    candidate in that row/column outside the block."""
-    values, removal_values = [], []
+    candidate in that row/column outside the block.  blocks is a tuple of the
+    blocks to search, each a tuple of cell coords. """
+    result = PatternResult()
+    if positions is None:
+        positions = DigitPositions(board, cand_board)
 
     # Loop through each block
-    for b in range(0, 9):
-        cellsInBlock = GetBlockCells_BlockID(board, b)
-        candsInBlock = GetBlockCells_BlockID(cand_board, b)
+    for block in blocks:
+        block_positions = positions[UNIT_IDS[block]]
 
         # Loop through all possible numbers
         for n in range(1, 10):
-            idx = [c for c in range(0, 9) if cellsInBlock[c] == 0 and n in candsInBlock[c]]
+            idx = MASK_INDEXES[block_positions[n]]
 
             # If only found number n twice in col or row, check if in same row/col
             if len(idx) == 2:
-                i1, j1 = GetCellCoordsFromBlockID(b, idx[0])
-                i2, j2 = GetCellCoordsFromBlockID(b, idx[1])
+                (i1, j1), (i2, j2) = block[idx[0]], block[idx[1]]
 
                 if i1 == i2 or j1 == j2:
-                    this_pattern = [PatternInfo(i1, j1, {n}), PatternInfo(i2, j2, {n})]
-
                     # Mark candidates with value n in same row/col for removal
-                    rcells = GetRowCells(board, i1) if i1 == i2 else GetColCells(board, j1)
-                    rcands = GetRowCells(cand_board, i1) if i1 == i2 else GetColCells(cand_board, j1)
+                    line = ROW_COORDS[i1] if i1 == i2 else COL_COORDS[j1]
+                    rcells = UnitCells(board, line)
+                    rcands = UnitCells(cand_board, line)
+                    num_entries = len(result)
+                    RemovalCandidates(rcells, rcands, {n}, line, [(i1, j1), (i2, j2)], result)
 
-                    def LocFunc(rc):
-                        return (i1, rc) if i1 == i2 else (rc, j1)
-                    this_removals = RemovalCandidates(rcells, rcands, {n}, LocFunc, [(i1, j1), (i2, j2)])
+                    if len(result) > num_entries:
+                        result.AddValue(i1, j1, DIGIT_BITS[n])
+                        result.AddValue(i2, j2, DIGIT_BITS[n])
 
-                    if len(this_removals):
-                        values += this_pattern
-                        removal_values += this_removals
+    return result
 
-    return values, removal_values
 
+def PointingPairs(board, cand_board, positions=None):
+    return FindPointingPair(board, cand_board, BLOCK_COORDS, positions)
 
-def FindBoxTriples(board, cand_board, unit_func, coord_func):
+
+def FindBoxTriples(board, cand_board, units):
     """ Finds all box triples.  This is where only 3 candidates in a given block, row or column.  Means we can remove
     the same candidates in the same row/col outside the block. """
 
-    values, removal_values = [], []
+    result = PatternResult()
 
     # For each row/col
-    for u in range(0, 9):
-        cells = unit_func(board, u)      # Cells in this row or column only
-        cands = unit_func(cand_board, u)  # Cands in this row or column only
+    for unit in units:
+        cells = UnitCells(board, unit)      # Cells in this row or column only
+        cands = UnitCells(cand_board, unit)  # Cands in this row or column only
 
         # Loop thro each set of 3 cells in each block in this row/col
         for b in range(0, 3):
@@ -209,51 +316,50 @@ def FindBoxTriples(board, cand_board, unit_func, coord_func):
 
                 # If only 3 possible candidates in these 3 cells
                 if len(tripCandSet) == 3:
-                    x, y, z = tripCandSet
-                    trip_loc = [coord_func(u, cs + k) for k in range(0, 3)]
-                    for k in range(0, 3):
-                        this_pattern = [PatternInfo(*trip_loc[k], tripCandSet & cands[cs + k])]
+                    trip_loc = list(unit[cs:cs + 3])
 
                     # Mark candidates with value n in same row/col for removal
-                    rcells = unit_func(board, u)
-                    removal_values += RemovalCandidates(rcells, cands, {x, y, z}, lambda k: coord_func(u, k), trip_loc)
+                    RemovalCandidates(cells, cands, tripCandSet, unit, trip_loc, result)
 
                     # Mark candidates with value n in same block for removal
-                    bl = GetBlockIDFromCellCoords(*coord_func(u, cs))
-                    rbcells = GetBlockCells_BlockID(board, bl)
-                    rbcands = GetBlockCells_BlockID(cand_board, bl)
-                    this_removals = RemovalCandidates(rbcells, rbcands, {x, y, z},
-                                                        lambda k: GetCellCoordsFromBlockID(bl, k), trip_loc)
-                    if len(this_removals):
-                        values += this_pattern
-                        removal_values += this_removals
+                    i, j = unit[cs]
+                    block = BLOCK_COORDS[CELL_BLOCK[9 * i + j]]
+                    rbcells = UnitCells(board, block)
+                    rbcands = UnitCells(cand_board, block)
+                    num_entries = len(result)
+                    RemovalCandidates(rbcells, rbcands, tripCandSet, block, trip_loc, result)
+                    if len(result) > num_entries:
+                        result.AddValue(*trip_loc[2], SetToMask(tripCandSet & cands[cs + 2]))
 
-    return values, removal_values
+    return result
 
 
 def BoxTriples(board, cand_board):
     # Rows
-    values_row, removal_values_row = FindBoxTriples(board, cand_board, GetRowCells, GetCellCoordsFromRowID)
+    result = FindBoxTriples(board, cand_board, ROW_COORDS)
     # Columns
-    values_col, removal_values_col = FindBoxTriples(board, cand_board, GetColCells, GetCellCoordsFromColID)
+    result += FindBoxTriples(board, cand_board, COL_COORDS)
+
+    return result
 
-    return values_row + values_col, removal_values_row + removal_values_col
 
+def FindXWing(board, cand_board, units, digits=range(1, 10), positions=None):
+    """ Finds X-wings for each of the digits, where a number can only go in the same two places in two rows
+    (or columns).  Means it can be removed from the rest of those columns (or rows). """
+    result = PatternResult()
+    if positions is None:
+        positions = DigitPositions(board, cand_board)
 
-def FindXWing(board, cand_board, unit_func, coord_func):
-    values, removal_values = [], []
+    unit_positions = [positions[UNIT_IDS[unit]] for unit in units]
 
     # Loop through all possible numbers
-    for n in range(1, 10):
+    for n in digits:
 
         pair_loc = []
 
         # For each row/col
-        for u in range(0, 9):
-            cells = unit_func(board, u)  # Cells in this row or column only
-            cands = unit_func(cand_board, u)  # Cands in this row or column only
-
-            idx = [c for c in range(0, 9) if cells[c] == 0 and n in cands[c]]
+        for u, unit in enumerate(units):
+            idx = MASK_INDEXES[unit_positions[u][n]]
 
             # If just two places for n in this row/col, idx now a list of two location values
             # see if matching pair from another row/col to form a square pattern
@@ -261,86 +367,272 @@ def FindXWing(board, cand_board, unit_func, coord_func):
                 for pair in pair_loc:
                     u_p, idxp = pair
                     if idxp == idx:
-                        this_pattern = [PatternInfo(*coord_func(u, idx[0]), {n}),
-                                        PatternInfo(*coord_func(u, idx[1]), {n}),
-                                        PatternInfo(*coord_func(u_p, idxp[0]), {n}),
-                                        PatternInfo(*coord_func(u_p, idxp[1]), {n})]
-                        this_removals = XWingRemovals(board, cand_board, this_pattern)
+                        xwing = [unit[idx[0]], unit[idx[1]], units[u_p][idxp[0]], units[u_p][idxp[1]]]
+                        num_entries = len(result)
+                        XWingRemovals(board, cand_board, n, xwing, result)
 
-                        if len(this_removals):
-                            values += this_pattern
-                            removal_values += this_removals
+                        if len(result) > num_entries:
+                            for i, j in xwing:
+                                result.AddValue(i, j, DIGIT_BITS[n])
 
                 pair_loc += [(u, idx)]
 
-    return values, removal_values
+    return result
 
 
-def XWingRemovals(board, cand_board, xwing):
-    removal_values = []
+def XWingRemovals(board, cand_board, n, xwing, result=None):
+    """ Add the removals of n for an X-wing given as its 4 cell coords to result (a new PatternResult if
+    None), returns the result """
+    if result is None:
+        result = PatternResult()
+    bit = DIGIT_BITS[n]
 
     assert (len(xwing) == 4)
-    xw1, xw2, xw3, xw4 = xwing
-    n = next(iter(xw1.candidates))
-
-    rows = list({xw1.i, xw2.i, xw3.i, xw4.i})
-    cols = list({xw1.j, xw2.j, xw3.j, xw4.j})
+    rows = list({i for i, _ in xwing})
+    cols = list({j for _, j in xwing})
 
     for row in rows:
-        row_cells = GetRowCells(board, row)
-        row_cands = GetRowCells(cand_board, row)
-
         for col in range(0, 9):
-            if col not in cols and row_cells[col] == 0 and n in row_cands[col]:
-                removal_values.append(PatternInfo(row, col, {n}))
+            if col not in cols and board[row][col] == 0 and n in cand_board[row][col]:
+                result.AddRemoval(row, col, bit)
 
     for col in cols:
-        col_cells = GetColCells(board, col)
-        col_cands = GetColCells(cand_board, col)
-
         for row in range(0, 9):
-            if row not in rows and col_cells[row] == 0 and n in col_cands[row]:
-                removal_values.append(PatternInfo(row, col, {n}))
+            if row not in rows and board[row][col] == 0 and n in cand_board[row][col]:
+                result.AddRemoval(row, col, bit)
+
+    return result
 
-    return removal_values
 
+def XWings(board, cand_board, positions=None):
+    if positions is None:
+        positions = DigitPositions(board, cand_board)
 
-def XWings(board, cand_board):
     # Rows
-    values_row,  removal_values_row = FindXWing(board, cand_board, GetRowCells, GetCellCoordsFromRowID)
+    result = FindXWing(board, cand_board, ROW_COORDS, positions=positions)
     # Columns
-    values_col, removal_values_col = FindXWing(board, cand_board, GetColCells, GetCellCoordsFromColID)
+    result += FindXWing(board, cand_board, COL_COORDS, positions=positions)
+
+    assert(sum(1 for _ in result.Values()) % 4 == 0)
+
+    return result
+
+
+###############################################################################
+# Naked and hidden subsets
+#
+# A naked subset is N cells in a unit whose candidates together are only N
+# digits, so those digits can be removed from the rest of the unit.  A hidden
+# subset is N digits that together can only go in N cells of a unit, so any
+# other candidates can be removed from those cells.  Both are found by
+# building up combinations of 9 bit masks (cell candidates or digit
+# positions), dropping any whose union already has more than N bits.
+
+
+def MaskSubsets(masks, size):
+    """ Yield (indexes, union) for each combination of size masks whose union has size bits set """
+    stack = [(0, (), 0)]
+    while stack:
+        start, chosen, union = stack.pop()
+        if len(chosen) == size:
+            if BIT_COUNT[union] == size:
+                yield chosen, union
+            continue
+
+        for idx in range(len(masks) - 1, start - 1, -1):
+            new_union = union | masks[idx]
+            if BIT_COUNT[new_union] <= size:
+                stack.append((idx + 1, chosen + (idx,), new_union))
+
 
-    assert(len(values_row + values_col) % 4 == 0)
-    # xwings = [values[x:x+4] for x in range(0, len(values), 4)]
-    # removal_values = XWingRemovals(board, cand_board, xwings)
+def FindNakedSubset(board, cand_board, units, size):
+    """ Finds naked subsets of the given size (2-4) in each unit.  Returns a PatternResult with the
+    subset cells and the candidates that can be removed from the rest of the unit. """
+    result = PatternResult()
 
-    return values_row + values_col, removal_values_row + removal_values_col
+    for unit in units:
+        cells = UnitCells(board, unit)
+        cands = UnitCells(cand_board, unit)
 
+        subset_cells = [c for c in range(9) if cells[c] == 0 and 2 <= len(cands[c]) <= size]
+        masks = [SetToMask(cands[c]) for c in subset_cells]
 
-def RemovalCandidates(unit_cells, candidates, values, LocFunc, exclusion_list):
-    """ Marks all candidates with value n for removal if not in exclusion list.
+        for chosen, union in MaskSubsets(masks, size):
+            locs = [unit[subset_cells[x]] for x in chosen]
+            num_entries = len(result)
+            RemovalCandidates(cells, cands, set(MASK_SETS[union]), unit, locs, result)
+            if len(result) > num_entries:
+                for x, (i, j) in zip(chosen, locs):
+                    result.AddValue(i, j, masks[x])
+
+    return result
+
+
+def FindHiddenSubset(board, cand_board, units, size, positions=None):
+    """ Finds hidden subsets of the given size (2-4) in each unit.  Returns a PatternResult with the
+    subset digits in their cells and the other candidates that can be removed from those cells. """
+    result = PatternResult()
+    if positions is None:
+        positions = DigitPositions(board, cand_board)
+
+    for unit in units:
+        unit_positions = positions[UNIT_IDS[unit]]
+
+        digits = [n for n in range(1, 10) if 2 <= BIT_COUNT[unit_positions[n]] <= size]
+        masks = [unit_positions[n] for n in digits]
+
+        for chosen, union in MaskSubsets(masks, size):
+            subset_mask = SetToMask(digits[x] for x in chosen)
+            cell_masks = [(i, j, SetToMask(cand_board[i][j])) for i, j in (unit[c] for c in MASK_INDEXES[union])]
+
+            if any(cand_mask & ~subset_mask for _, _, cand_mask in cell_masks):
+                for i, j, cand_mask in cell_masks:
+                    result.AddValue(i, j, cand_mask & subset_mask)
+                    if cand_mask & ~subset_mask:
+                        result.AddRemoval(i, j, cand_mask & ~subset_mask)
+
+    return result
+
+
+def NakedSubsets(board, cand_board, size):
+    """ Naked subsets of a given size in rows, columns then blocks """
+    result = PatternResult()
+    for units in (ROW_COORDS, COL_COORDS, BLOCK_COORDS):
+        result += FindNakedSubset(board, cand_board, units, size)
+
+    return result
+
+
+def HiddenSubsets(board, cand_board, size, positions=None):
+    """ Hidden subsets of a given size in rows, columns then blocks """
+    if positions is None:
+        positions = DigitPositions(board, cand_board)
+
+    result = PatternResult()
+    for units in (ROW_COORDS, COL_COORDS, BLOCK_COORDS):
+        result += FindHiddenSubset(board, cand_board, units, size, positions)
+
+    return result
+
+
+###############################################################################
+# Fish patterns on digit planes
+#
+# A digit plane is an 81 bit int with bit 9*i + j set if cell (i,j) is empty
+# and has the digit as a candidate.  A fish of size N is N rows (the base)
+# where the digit can only go in the same N columns (the cover), so it can be
+# removed from the rest of those columns.  The same holds swapping rows and
+# columns, which is searched as rows of the transposed plane.  An X-wing is a
+# fish of size 2.
+
+ROW_PLANES = tuple(0x1FF << (9 * r) for r in range(9))
+COL_PLANES = tuple(sum(1 << (9 * i + c) for i in range(9)) for c in range(9))
+
+
+def DigitPlanes(board, cand_board, digits=range(1, 10), transpose=False):
+    """ Dict of digit to its plane, the plane of the transposed board if transpose is True """
+    planes = dict.fromkeys(digits, 0)
+    for i in range(9):
+        for j in range(9):
+            if board[i][j] == 0:
+                bit = 1 << (9 * j + i if transpose else 9 * i + j)
+                for n in cand_board[i][j]:
+                    if n in planes:
+                        planes[n] |= bit
+    return planes
+
+
+def PlaneCells(plane):
+    """ Yield the flat cell index k of each bit set in a plane """
+    while plane:
+        low = plane & -plane
+        yield low.bit_length() - 1
+        plane ^= low
+
+
+def _PlaneCell(k, transpose):
+    """ Cell index of bit k of a plane """
+    return 9 * (k % 9) + k // 9 if transpose else k
+
+
+def FindFish(board, cand_board, size, transpose=False, digits=range(1, 10)):
+    """ Find fish of the given size with rows as the base, or columns if transpose is True.  Returns a
+    PatternResult with the base cells and the candidates that can be removed from the cover. """
+    result = PatternResult()
+
+    for n, plane in DigitPlanes(board, cand_board, digits, transpose).items():
+        # Column pattern of each row that has 2 to size places for n
+        lines = [(r, (plane >> (9 * r)) & 0x1FF) for r in range(9)]
+        lines = [(r, cols) for r, cols in lines if 2 <= BIT_COUNT[cols] <= size]
+
+        # Build up the base a row at a time, dropping any where the cover is already too big
+        stack = [(0, (), 0)]
+        while stack:
+            start, base, cover = stack.pop()
+            if len(base) == size:
+                if BIT_COUNT[cover] != size:
+                    continue
+                base_plane = sum(ROW_PLANES[r] for r in base)
+                cover_plane = sum(COL_PLANES[c] for c in MASK_INDEXES[cover])
+                removals = plane & cover_plane & ~base_plane
+                if removals:
+                    bit = DIGIT_BITS[n]
+                    for k in PlaneCells(plane & base_plane):
+                        result.Add(_PlaneCell(k, transpose), bit)
+                    for k in PlaneCells(removals):
+                        result.Add(_PlaneCell(k, transpose), bit, PatternResult.REMOVAL)
+                continue
+
+            for idx in range(len(lines) - 1, start - 1, -1):
+                r, cols = lines[idx]
+                new_cover = cover | cols
+                if BIT_COUNT[new_cover] <= size:
+                    stack.append((idx + 1, base + (r,), new_cover))
+
+    return result
+
+
+def Fish(board, cand_board, size):
+    """ Fish of a given size with rows then columns as the base """
+    result = FindFish(board, cand_board, size)
+    result += FindFish(board, cand_board, size, transpose=True)
+
+    return result
+
+
+def Swordfish(board, cand_board):
+    return Fish(board, cand_board, 3)
+
+
+def Jellyfish(board, cand_board):
+    return Fish(board, cand_board, 4)
+
+
+def RemovalCandidates(unit_cells, candidates, values, unit, exclusion_list, result=None):
+    """ Marks all candidates with value n for removal if not in exclusion list, adding them to result (a new
+    PatternResult if None).  Returns the result.
     cells           - list of ints containing the values in the cells in the given unit (row, col, block)
     candidates      - list of sets of ints representing candidates for each cell
-    LocFunc         - function that translates the 0->9 index to i,j cell coords
+    unit            - tuple of the i,j cell coords of the unit
     values          - set of int values to be removed from the cells candidates
     exclusion_list  - list of cells coords excluded from removal.
 
     The exclusion list is for the cells that cause the removal (ie original pointing
     pair or similar) to avoid candidates causing their own removal.
     """
-    removal_values = []
+    if result is None:
+        result = PatternResult()
 
     assert(len(unit_cells) == 9)
     assert(type(values) is set)
 
     # Loop through each cell of the unit
     for i, cell in enumerate(unit_cells):
-        ri, rj = LocFunc(i)
+        ri, rj = unit[i]
 
         values_in_cell = values & candidates[i]
 
         if cell == 0 and (ri, rj) not in exclusion_list and len(values_in_cell) > 0:
-            removal_values.append(PatternInfo(ri, rj, values_in_cell))
+            result.AddRemoval(ri, rj, SetToMask(values_in_cell))
 
-    return removal_values
\ No newline at end of file
+    return result
\ No newline at end of file
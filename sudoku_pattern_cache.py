@@ -0,0 +1,154 @@
+import sudoku_pattern as sdp
+from sudoku_coords import BLOCK_UNIT, BLOCK_LINES, CELL_UNITS, COL_COORDS, ROW_COORDS, UNIT_COORDS
+
+###############################################################################
+# Incremental pattern detection
+#
+# Each pattern search in sudoku_pattern is split into slots, eg one per unit
+# for hidden singles or one per block for pointing pairs.  The result of a
+# slot only depends on the cells of a few units, so when a cell value or its
+# candidates change only the slots that depend on one of the cell's units are
+# searched again.  X-wings and the other fish depend on the whole board so have
+# a slot per digit and orientation, and are searched again when that digit
+# changes anywhere.
+# The results of the slots are joined in order, so match the full search.
+# The digit positions shared by the finders are also kept, and rebuilt only
+# for the units of changed cells.
+
+ALL_DIGITS = frozenset(range(1, 10))
+
+
+def _Slot(find_func, units, uses_positions):
+    """ Function searching a single slot for a sudoku_pattern Find function taking a tuple of units """
+    if uses_positions:
+        return lambda board, cand_board, positions: find_func(board, cand_board, units, positions)
+    return lambda board, cand_board, positions: find_func(board, cand_board, units)
+
+
+def _UnitSlots(find_func, unit_ids, depends, uses_positions=True):
+    """ List of (slot function, units it depends on) for a search over each of the given units """
+    return [(_Slot(find_func, (UNIT_COORDS[u],), uses_positions), depends(u)) for u in unit_ids]
+
+
+def _SubsetFunc(find_func, size):
+    """ sudoku_pattern subset finder with the size fixed """
+    return lambda board, cand_board, units, *positions: find_func(board, cand_board, units, size, *positions)
+
+
+def _LineDepends(u):
+    """ A row or column plus the blocks it crosses """
+    return {u} | {BLOCK_UNIT + b for b in range(9) if u in BLOCK_LINES[b]}
+
+
+def _XWingSlot(units, n):
+    return lambda board, cand_board, positions: sdp.FindXWing(board, cand_board, units, (n,), positions)
+
+
+def _FishSlots(size):
+    """ Fish slots for each orientation and digit """
+    def Slot(transpose, n):
+        return lambda board, cand_board, positions: sdp.FindFish(board, cand_board, size, transpose, (n,))
+    return [(Slot(transpose, n), {-n}) for transpose in (False, True) for n in range(1, 10)]
+
+
+# For each pattern the slots as (function, units the result depends on) in the order of the full search.
+# Fish slots depend on a digit, given as a negative number to keep apart from the unit ids.
+PATTERN_SLOTS = {
+    'hidden_single': _UnitSlots(sdp.FindHiddenSingle, range(27), lambda u: {u}),
+    'naked_pair': _UnitSlots(sdp.FindNakedPair, range(27), lambda u: {u}, False),
+    'naked_triple': _UnitSlots(_SubsetFunc(sdp.FindNakedSubset, 3), range(27), lambda u: {u}, False),
+    'naked_quad': _UnitSlots(_SubsetFunc(sdp.FindNakedSubset, 4), range(27), lambda u: {u}, False),
+    'hidden_pair': _UnitSlots(_SubsetFunc(sdp.FindHiddenSubset, 2), range(27), lambda u: {u}),
+    'hidden_triple': _UnitSlots(_SubsetFunc(sdp.FindHiddenSubset, 3), range(27), lambda u: {u}),
+    'hidden_quad': _UnitSlots(_SubsetFunc(sdp.FindHiddenSubset, 4), range(27), lambda u: {u}),
+    'pointing_pair': _UnitSlots(sdp.FindPointingPair, range(BLOCK_UNIT, 27),
+                                lambda u: {u} | set(BLOCK_LINES[u - BLOCK_UNIT])),
+    'box_line_pair': _UnitSlots(sdp.FindBoxLinePair, range(BLOCK_UNIT), _LineDepends),
+    'box_triple': _UnitSlots(sdp.FindBoxTriples, range(BLOCK_UNIT), _LineDepends, False),
+    'x_wing': [(_XWingSlot(units, n), {-n}) for units in (ROW_COORDS, COL_COORDS) for n in range(1, 10)],
+    'swordfish': _FishSlots(3),
+    'jellyfish': _FishSlots(4)
+}
+
+
+def _SlotsByDependency(slots):
+    """ Dict of unit id (or negative digit) to the indexes of the slots depending on it """
+    by_unit = {}
+    for s, (_, depends) in enumerate(slots):
+        for u in depends:
+            by_unit.setdefault(u, set()).add(s)
+    return by_unit
+
+
+def _DependentSlots():
+    """ For each pattern the slots that depend on each cell, and the slots that depend on each digit """
+    cell_slots, digit_slots = {}, {}
+    for name, slots in PATTERN_SLOTS.items():
+        by_unit = _SlotsByDependency(slots)
+        cell_slots[name] = [frozenset().union(*(by_unit.get(u, ()) for u in CELL_UNITS[k])) for k in range(81)]
+        digit_slots[name] = {n: frozenset(by_unit[-n]) for n in range(1, 10) if -n in by_unit}
+    return cell_slots, digit_slots
+
+
+CELL_SLOTS, DIGIT_SLOTS = _DependentSlots()
+
+
+class PatternCache:
+    def __init__(self):
+        # For each pattern the PatternResult of each slot, and the slots that need searching again
+        self.results = {name: [None] * len(slots) for name, slots in PATTERN_SLOTS.items()}
+        self.dirty = {}
+
+        # Digit positions (see sudoku_pattern.DigitPositions) and the units whose positions need rebuilding
+        self.positions = None
+        self.dirty_units = set()
+        self.MarkAllDirty()
+
+    def MarkAllDirty(self):
+        self.dirty = {name: set(range(len(slots))) for name, slots in PATTERN_SLOTS.items()}
+        self.dirty_units = set(range(27))
+
+    def MarkCellChanged(self, i, j, digits=ALL_DIGITS):
+        """ Mark the slots depending on cell (i,j) as needing a new search.  digits are the values that were
+        added to or removed from the cell's candidates, or all the candidates the cell had or has if its
+        value changed. """
+        k = 9 * i + j
+        self.dirty_units.update(CELL_UNITS[k])
+        for name, dirty in self.dirty.items():
+            dirty |= CELL_SLOTS[name][k]
+            by_digit = DIGIT_SLOTS[name]
+            if by_digit:
+                for n in digits:
+                    dirty |= by_digit[n]
+
+    def MarkCandidateChanges(self, old_cand_board, new_cand_board):
+        """ Mark the cells whose candidates differ between two candidate boards """
+        for i in range(9):
+            for j in range(9):
+                changed = old_cand_board[i][j] ^ new_cand_board[i][j]
+                if changed:
+                    self.MarkCellChanged(i, j, changed)
+
+    def Find(self, name, board, cand_board):
+        """ PatternResult for the named pattern (see PATTERN_SLOTS) like the sudoku_pattern functions,
+        searching only the slots affected by changes since the last call """
+        slots = PATTERN_SLOTS[name]
+        results = self.results[name]
+        dirty = self.dirty[name]
+        if dirty:
+            positions = self.GetPositions(board, cand_board)
+            for s in dirty:
+                results[s] = slots[s][0](board, cand_board, positions)
+            dirty.clear()
+
+        result = sdp.PatternResult()
+        for slot_result in results:
+            result += slot_result
+        return result
+
+    def GetPositions(self, board, cand_board):
+        """ Digit positions for the board, rebuilding those of changed units """
+        if self.dirty_units:
+            self.positions = sdp.DigitPositions(board, cand_board, self.dirty_units, self.positions)
+            self.dirty_units.clear()
+        return self.positions
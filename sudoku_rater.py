@@ -0,0 +1,205 @@
+import argparse
+import sys
+from dataclasses import dataclass, field
+from multiprocessing import Pool
+
+import sudoku as sd
+import sudoku_coords as sdc
+from sudoku_bitmask import MASK_DIGITS, SetToMask
+from sudoku_pattern_cache import PatternCache
+
+###############################################################################
+# Difficulty rating by logical solving
+#
+# The puzzle is solved using only the techniques in sudoku_pattern.  At each
+# step the techniques are tried from cheapest to most expensive, and all the
+# placements or candidate removals found by the first that applies are made
+# before going back to the cheapest.  The grade is the weight of the hardest
+# technique needed, or UNSOLVED_GRADE if the techniques run out before the
+# board is solved.  Pattern searches go through a PatternCache so each step
+# only searches again where the last step made changes.
+
+
+@dataclass
+class Technique:
+    name: str
+    weight: float
+    func: object    # func(board, cand_board, patterns) -> (placements, removals) as iterables of (k, mask)
+
+
+@dataclass
+class RatingStep:
+    technique: str
+    placements: int
+    removals: int
+
+
+@dataclass
+class Rating:
+    grade: float        # Weight of the hardest technique used, UNSOLVED_GRADE if not solved
+    effort: float       # Total weight of all the steps
+    solved: bool
+    counts: dict = field(default_factory=dict)     # Number of steps using each technique
+    steps: list = field(default_factory=list)      # RatingStep for each step in order
+
+
+UNSOLVED_GRADE = 10.0
+
+
+def NakedSingles(board, cand_board, patterns):
+    """ Empty cells with only one candidate, as placements """
+    return [(9 * i + j, SetToMask(cand_board[i][j]))
+            for i in range(9) for j in range(9) if board[i][j] == 0 and len(cand_board[i][j]) == 1], ()
+
+
+def HiddenSingles(board, cand_board, patterns):
+    return patterns.Find('hidden_single', board, cand_board).Values(), ()
+
+
+def Removals(name):
+    """ Technique function for a pattern in sudoku_pattern_cache giving candidate removals """
+    def RemovalsFunc(board, cand_board, patterns):
+        return (), patterns.Find(name, board, cand_board).Removals()
+    return RemovalsFunc
+
+
+# Techniques in the order they are tried, cheapest first
+TECHNIQUES = [Technique('hidden_single', 1.5, HiddenSingles),
+              Technique('naked_single', 2.3, NakedSingles),
+              Technique('pointing_pair', 2.6, Removals('pointing_pair')),
+              Technique('box_line_pair', 2.8, Removals('box_line_pair')),
+              Technique('naked_pair', 3.0, Removals('naked_pair')),
+              Technique('x_wing', 3.2, Removals('x_wing')),
+              Technique('hidden_pair', 3.4, Removals('hidden_pair')),
+              Technique('box_triple', 3.6, Removals('box_triple')),
+              Technique('naked_triple', 3.6, Removals('naked_triple')),
+              Technique('swordfish', 3.8, Removals('swordfish')),
+              Technique('hidden_triple', 4.0, Removals('hidden_triple')),
+              Technique('naked_quad', 5.0, Removals('naked_quad')),
+              Technique('jellyfish', 5.2, Removals('jellyfish')),
+              Technique('hidden_quad', 5.4, Removals('hidden_quad'))]
+
+
+def ApplyStep(board, cand_board, placements, removals, patterns=None):
+    """ Make the placements and remove the candidates in place, marking the changed cells in the optional
+    PatternCache.  placements and removals are (cell index, candidate mask) pairs, as given by a
+    PatternResult.  Returns the number of placements and removals actually made. """
+    num_placed = 0
+    for k, mask in placements:
+        i, j, n = k // 9, k % 9, MASK_DIGITS[mask][0]
+        if board[i][j] == 0 and n in cand_board[i][j]:
+            if patterns is not None:
+                patterns.MarkCellChanged(i, j, cand_board[i][j])
+            board[i][j] = n
+            cand_board[i][j] = {n}
+            for pi, pj in sdc.PEER_COORDS[9 * i + j]:
+                if n in cand_board[pi][pj]:
+                    cand_board[pi][pj].discard(n)
+                    if patterns is not None:
+                        patterns.MarkCellChanged(pi, pj, {n})
+            num_placed += 1
+
+    num_removed = 0
+    for k, mask in removals:
+        cands = cand_board[k // 9][k % 9]
+        removed = cands.intersection(MASK_DIGITS[mask])
+        if removed:
+            cands -= removed
+            num_removed += len(removed)
+            if patterns is not None:
+                patterns.MarkCellChanged(k // 9, k % 9, removed)
+
+    return num_placed, num_removed
+
+
+def RatePuzzle(board, techniques=None):
+    """ Rate a board by solving it with logical techniques only, returns a Rating """
+    techniques = techniques if techniques is not None else TECHNIQUES
+    board = [list(row) for row in board]
+    cand_board = sd.SolveCandidates(board)
+    patterns = PatternCache()
+    rating = Rating(0.0, 0.0, False)
+
+    if not sd.BoardIsValid(board):
+        rating.grade = UNSOLVED_GRADE
+        return rating
+
+    while not sd.BoardSolved(board):
+        for technique in techniques:
+            num_placed, num_removed = ApplyStep(board, cand_board, *technique.func(board, cand_board, patterns),
+                                               patterns)
+            if num_placed or num_removed:
+                break
+        else:
+            rating.grade = UNSOLVED_GRADE
+            return rating
+
+        rating.steps.append(RatingStep(technique.name, num_placed, num_removed))
+        rating.counts[technique.name] = rating.counts.get(technique.name, 0) + 1
+        rating.grade = max(rating.grade, technique.weight)
+        rating.effort += technique.weight
+
+        # A cell with no candidates left means the puzzle has no solution
+        if any(not cand_board[i][j] for i in range(9) for j in range(9) if board[i][j] == 0):
+            rating.grade = UNSOLVED_GRADE
+            return rating
+
+    rating.solved = sd.BoardIsValid(board)
+    if not rating.solved:
+        rating.grade = UNSOLVED_GRADE
+    return rating
+
+
+def RatePuzzleString(str_board):
+    """ (puzzle, Rating) for a puzzle in string format, the Rating is None if the string is not a board """
+    board = sd.BoardFromString(str_board)
+    return str_board, None if board is None else RatePuzzle(board)
+
+
+def RateBatch(puzzles, processes=None, chunksize=16):
+    """ Rate an iterable of puzzle strings, yielding (puzzle, Rating) for each in input order.
+    processes - number of worker processes, None uses all cores and 1 rates in this process
+    chunksize - number of puzzles sent to a worker at a time """
+    if processes == 1:
+        yield from map(RatePuzzleString, puzzles)
+        return
+
+    with Pool(processes) as pool:
+        yield from pool.imap(RatePuzzleString, puzzles, chunksize)
+
+
+def FormatTrace(rating):
+    """ Step trace as technique:placements/removals separated by spaces """
+    return ' '.join('{}:{}/{}'.format(step.technique, step.placements, step.removals) for step in rating.steps)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Rate a file of sudoku puzzles, one 81 character puzzle per line. '
+                                                 'Writes puzzle,grade,effort,solved[,trace] for each puzzle.')
+    parser.add_argument('input', nargs='?', default='-', help='puzzle file, - for stdin')
+    parser.add_argument('-o', '--output', default='-', help='results file, - for stdout')
+    parser.add_argument('-p', '--processes', type=int, default=None, help='worker processes, default all cores')
+    parser.add_argument('-c', '--chunksize', type=int, default=16, help='puzzles sent to a worker at a time')
+    parser.add_argument('--trace', action='store_true', help='add the step trace')
+    args = parser.parse_args(argv)
+
+    in_file = sys.stdin if args.input == '-' else open(args.input)
+    out_file = sys.stdout if args.output == '-' else open(args.output, 'w')
+
+    try:
+        puzzles = (line.strip() for line in in_file if line.strip())
+        for puzzle, rating in RateBatch(puzzles, args.processes, args.chunksize):
+            if rating is None:
+                out_file.write('{},,,\n'.format(puzzle))
+                continue
+            line = '{},{:.1f},{:.1f},{}'.format(puzzle, rating.grade, rating.effort, int(rating.solved))
+            out_file.write(line + (',' + FormatTrace(rating) if args.trace else '') + '\n')
+    finally:
+        if in_file is not sys.stdin:
+            in_file.close()
+        if out_file is not sys.stdout:
+            out_file.close()
+
+
+if __name__ == "__main__":
+    main()
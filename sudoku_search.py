@@ -0,0 +1,335 @@
+import time
+from dataclasses import dataclass
+
+import sudoku_bitmask as sdb
+import sudoku_coords as sdc
+
+
+###############################################################################
+# Search statistics
+
+@dataclass
+class SearchStats:
+    """ Statistics filled in by a solver run when passed as its stats argument """
+    nodes: int = 0                  # Search nodes visited
+    backtracks: int = 0             # Guesses undone without finding a solution
+    max_depth: int = 0              # Deepest guess
+    naked_singles: int = 0          # Cells filled in by propagation with only one candidate
+    hidden_singles: int = 0         # Cells filled in by propagation as the only place for a digit in a unit
+    propagate_seconds: float = 0.0  # Time spent in propagation
+    wall_seconds: float = 0.0       # Total time of the solver run
+
+    @property
+    def search_seconds(self):
+        """ Time spent in the search outside propagation """
+        return max(0.0, self.wall_seconds - self.propagate_seconds)
+
+    def Visit(self, depth):
+        self.nodes += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+###############################################################################
+# In place backtracking search
+#
+# The search works on a single CandidateMasks instance.  Each guess is made
+# with Assign(), which records its changes on the trail, and undone on
+# backtrack with Undo(), so no board is copied at any node.
+#
+# The searches are generators yielding each solution board as it is found,
+# so a caller can stop after the first few and only the current path is held
+# in memory.  Counting solutions is a loop over the generator.
+
+
+def SelectFirst(state, start):
+    """ Flat index of the first empty cell at or after start, or -1 if the board is full """
+    cells = state.cells
+    for k in range(start, 81):
+        if not cells[k]:
+            return k
+    return -1
+
+
+def SelectMRV(state, start):
+    """ Flat index of the empty cell with the fewest candidates, or -1 if the board is full.
+    Ties are broken by degree, ie the cell with the most empty peers. """
+    cells, cands = state.cells, state.cands
+    bit_count = sdb.BIT_COUNT
+
+    best_cells, best_count = [], 10
+    for k in range(81):
+        if not cells[k]:
+            count = bit_count[cands[k]]
+            if count < best_count:
+                if count <= 1:
+                    return k  # Dead end or forced, no need to look further
+                best_cells, best_count = [k], count
+            elif count == best_count:
+                best_cells.append(k)
+
+    if not best_cells:
+        return -1
+    if len(best_cells) == 1:
+        return best_cells[0]
+    return max(best_cells, key=lambda c: sum(1 for p in sdc.PEERS[c] if not cells[p]))
+
+
+# Functions to pick the next cell to branch on, by branching strategy name
+select_funcs = {'first': SelectFirst, 'mrv': SelectMRV}
+
+
+def CountSolutions(solutions, max_solutions=None):
+    """ (num_solns, soln_board) for an iterable of solution boards, with soln_board the first.  Stops
+    once max_solutions are found, None counts them all. """
+    num_solns = 0
+    soln_board = None
+    for board in solutions:
+        if soln_board is None:
+            soln_board = board
+        num_solns += 1
+        if max_solutions is not None and num_solns >= max_solutions:
+            break
+    return num_solns, soln_board
+
+
+def _IterTrail(state, select, start, stats=None, depth=0):
+    """ Backtracking search, branching on the cell chosen by select, yielding each solution board """
+    if stats is not None:
+        stats.Visit(depth)
+
+    k = select(state, start)
+    if k < 0:
+        yield state.ToBoard()  # Solved!
+        return
+
+    for value in sdb.MASK_DIGITS[state.cands[k]]:
+        mark = state.Mark()
+        found = False
+        if state.Assign(k, value):
+            for soln_board in _IterTrail(state, select, k + 1, stats, depth + 1):
+                found = True
+                yield soln_board
+        state.Undo(mark)
+
+        if stats is not None and not found:
+            stats.backtracks += 1
+
+
+def IterTrail(board, branching='first', stats=None):
+    """ Generator of the solutions of the puzzle found by backtracking, mutating a single candidate state
+    and unwinding its trail on backtrack.
+    branching     - name of the strategy used to pick the cell to branch on, see select_funcs
+    stats         - optional SearchStats to fill in """
+    state = sdb.CandidateMasks(board)
+    if not state.valid or not all(state.cands):
+        return
+
+    yield from _IterTrail(state, select_funcs[branching], 0, stats)
+
+
+def SolvewTrail(board, branching='first', max_solutions=None, stats=None):
+    """ Solve the puzzle via backtracking, see IterTrail.  Returns (num_solns, soln_board) like
+    sudoku.SolvewBacktrack.
+    max_solutions - stop once this many solutions are found, None counts them all """
+    return CountSolutions(IterTrail(board, branching, stats), max_solutions)
+
+
+###############################################################################
+# Search with constraint propagation at every node
+#
+# After each guess naked and hidden singles are filled in, followed by any
+# elimination hooks, until nothing changes.  A hook is a function taking the
+# CandidateMasks state and removing candidates with state.Eliminate().  It
+# returns the number of cells changed, or None if a cell was left with no
+# candidates.
+
+def _BlockLineSplits():
+    """ For each block and line (row or column) crossing it, the empty-board cells of
+    (intersection, rest of block, rest of line) """
+    splits = []
+    for b in range(9):
+        block = sdc.UNITS[sdc.BLOCK_UNIT + b]
+        for u in sdc.BLOCK_LINES[b]:
+            inter = sdc.INTERSECTIONS[sdc.BLOCK_UNIT + b][u]
+            splits.append((inter, tuple(k for k in block if k not in inter),
+                           tuple(k for k in sdc.UNITS[u] if k not in inter)))
+    return tuple(splits)
+
+
+BLOCK_LINE_SPLITS = _BlockLineSplits()
+
+
+def EliminateIntersections(state):
+    """ Pointing pairs/triples and box-line reductions.  If the only places for a digit in a block are on one
+    line, remove it from the rest of the line.  If the only places for a digit on a line are in one block,
+    remove it from the rest of the block. """
+    cells, cands = state.cells, state.cands
+    num_changed = 0
+
+    for inter, block_rest, line_rest in BLOCK_LINE_SPLITS:
+        inter_mask = 0
+        for k in inter:
+            if not cells[k]:
+                inter_mask |= cands[k]
+        if not inter_mask:
+            continue
+
+        block_mask = line_mask = 0
+        for k in block_rest:
+            if not cells[k]:
+                block_mask |= cands[k]
+        for k in line_rest:
+            if not cells[k]:
+                line_mask |= cands[k]
+
+        for bits, rest, rest_mask in ((inter_mask & ~block_mask, line_rest, line_mask),
+                                      (inter_mask & ~line_mask, block_rest, block_mask)):
+            if bits & rest_mask:
+                for k in rest:
+                    if not cells[k] and cands[k] & bits:
+                        if not state.Eliminate(k, bits):
+                            return None
+                        num_changed += 1
+
+    return num_changed
+
+
+def PatternElimination(pattern_func):
+    """ Wrap a sudoku_pattern function returning a PatternResult, eg NakedPairs, as an elimination
+    hook.  This converts the state to a board and candidate sets at each call, so is slower than a mask based
+    hook. """
+    def Eliminate(state):
+        num_removals = 0
+        for k, mask in pattern_func(state.ToBoard(), state.ToCandBoard()).Removals():
+            if not state.Eliminate(k, mask):
+                return None
+            num_removals += 1
+        return num_removals
+
+    return Eliminate
+
+
+# Elimination hooks by name
+elimination_funcs = {'intersections': EliminateIntersections}
+
+
+def PropagateAll(state, eliminations, units=None, stats=None):
+    """ Propagate singles and run the elimination hooks until nothing changes.
+    Returns False if a contradiction was found. """
+    if stats is None:
+        return _PropagateAll(state, eliminations, units)
+
+    start = time.perf_counter()
+    ok = _PropagateAll(state, eliminations, units, stats)
+    stats.propagate_seconds += time.perf_counter() - start
+    return ok
+
+
+def _PropagateAll(state, eliminations, units, stats=None):
+    while True:
+        num_placed = state.Propagate(units)
+        if num_placed is None:
+            return False
+        if stats is not None:
+            stats.naked_singles += num_placed[0]
+            stats.hidden_singles += num_placed[1]
+
+        num_changed = 0
+        for eliminate in eliminations:
+            num_changed = eliminate(state)
+            if num_changed is None:
+                return False
+            if num_changed:
+                break  # Go back to the cheaper singles first
+        if not num_changed:
+            return True
+        units = None
+
+
+def _IterPropagate(state, select, eliminations, stats=None, depth=0):
+    """ Backtracking search with propagation after each guess, yielding each solution board """
+    if stats is not None:
+        stats.Visit(depth)
+
+    k = select(state, 0)
+    if k < 0:
+        yield state.ToBoard()  # Solved!
+        return
+
+    for value in sdb.MASK_DIGITS[state.cands[k]]:
+        mark = state.Mark()
+        start = len(state.trail)
+        found = False
+        if state.Assign(k, value):
+            # Only units containing a cell that lost a candidate can have new hidden singles
+            units = {u for p, _ in state.trail[start:] for u in sdc.CELL_UNITS[p]}
+            if PropagateAll(state, eliminations, units, stats):
+                for soln_board in _IterPropagate(state, select, eliminations, stats, depth + 1):
+                    found = True
+                    yield soln_board
+        state.Undo(mark)
+
+        if stats is not None and not found:
+            stats.backtracks += 1
+
+
+def IterPropagate(board, branching='mrv', eliminations=(), stats=None):
+    """ Generator of the solutions of the puzzle found by backtracking with naked and hidden singles filled
+    in at every node, so dead ends are found as soon as a cell or unit has no options.
+    branching     - name of the strategy used to pick the cell to branch on, see select_funcs
+    eliminations  - elimination hooks, or their names in elimination_funcs, run after the singles
+    stats         - optional SearchStats to fill in """
+    eliminations = [elimination_funcs[e] if isinstance(e, str) else e for e in eliminations]
+
+    state = sdb.CandidateMasks(board)
+    if not state.valid or not PropagateAll(state, eliminations, stats=stats):
+        return
+
+    yield from _IterPropagate(state, select_funcs[branching], eliminations, stats)
+
+
+def SolvewPropagate(board, branching='mrv', max_solutions=None, eliminations=(), stats=None):
+    """ Solve the puzzle via backtracking with propagation, see IterPropagate.  Returns
+    (num_solns, soln_board).
+    max_solutions - stop once this many solutions are found, None counts them all """
+    return CountSolutions(IterPropagate(board, branching, eliminations, stats), max_solutions)
+
+
+###############################################################################
+# Splitting the search
+#
+# The propagate search is run down to a fixed depth and the board at each
+# node reached is given as a subproblem.  The guesses at each node are on
+# distinct values of one cell and propagation never removes a candidate that
+# is in a solution, so the solutions of the subproblems are disjoint and
+# together are all the solutions of the board.  Boards solved before the
+# split depth are given as they are.
+
+
+def _IterSplit(state, select, eliminations, depth):
+    k = select(state, 0)
+    if k < 0 or depth == 0:
+        yield state.ToBoard()
+        return
+
+    for value in sdb.MASK_DIGITS[state.cands[k]]:
+        mark = state.Mark()
+        start = len(state.trail)
+        if state.Assign(k, value):
+            units = {u for p, _ in state.trail[start:] for u in sdc.CELL_UNITS[p]}
+            if PropagateAll(state, eliminations, units):
+                yield from _IterSplit(state, select, eliminations, depth - 1)
+        state.Undo(mark)
+
+
+def IterSubproblems(board, split_depth, branching='mrv', eliminations=()):
+    """ Generator of the boards at split_depth guesses into the propagate search, in search order, whose
+    solutions are split between them.  Yields nothing if the board has no solution found by then.
+    branching and eliminations are as for IterPropagate. """
+    eliminations = [elimination_funcs[e] if isinstance(e, str) else e for e in eliminations]
+
+    state = sdb.CandidateMasks(board)
+    if not state.valid or not PropagateAll(state, eliminations):
+        return
+
+    yield from _IterSplit(state, select_funcs[branching], eliminations, split_depth)
@@ -1,5 +1,19 @@
 import sudoku as sd
+import sudoku_bitmask as sdb
+import sudoku_boards as sb
+import sudoku_batch as sbt
+import sudoku_coords as sdc
+import sudoku_pattern as sdp
+import sudoku_search as sds
+from sudoku_board import Board
+from sudoku_cache import SolutionCache
+import sudoku_canon as sdn
+import sudoku_generate as sdg
+import sudoku_rater as sdr
+from sudoku_pattern_cache import PatternCache
+from SudokuModel import SudokuModel
 import pytest
+from itertools import islice
 
 
 @pytest.fixture
@@ -61,3 +75,493 @@ def test_multiple_solutions():
 
     ns, sb = sd.SolvewBacktrack(test_board2)
     assert ns > 1
+
+
+def test_candidate_masks_match_sets(test_board):
+    cand_board = sd.SolveCandidates(test_board)
+    for i in range(9):
+        for j in range(9):
+            if test_board[i][j] == 0:
+                used = set(test_board[i]) | {row[j] for row in test_board} | \
+                       {test_board[3*(i//3) + a][3*(j//3) + b] for a in range(3) for b in range(3)}
+                assert cand_board[i][j] == set(range(1, 10)) - used
+            else:
+                assert cand_board[i][j] == {test_board[i][j]}
+
+
+def test_candidate_intersect_keeps_removals(test_board):
+    cand_board = sd.SolveCandidates(test_board)
+    cand_board[0][2].discard(3)
+    assert 3 not in sd.SolveCandidatesIntersect(test_board, cand_board)[0][2]
+
+
+def test_mask_set_round_trip():
+    assert sdb.SetToMask({1, 5, 9}) == 0b100010001
+    assert sdb.MaskToSet(0b100010001) == {1, 5, 9}
+
+
+@pytest.mark.parametrize('board', [sb.easyboard, sb.hardboard, sb.expertboard2, sb.multi_board])
+def test_trail_matches_copy(board):
+    ns, sb_trail = sd.SolvewBacktrack(board, mode='trail')
+    ns_copy, sb_copy = sd.SolvewBacktrack(board)
+    assert ns == ns_copy
+    if ns == 1:
+        assert sb_trail == sb_copy
+
+
+def test_trail_invalid_board(test_board):
+    test_board[4][4] = 5
+    test_board[8][8] = 1
+    assert sd.SolvewBacktrack(test_board, mode='trail') == (0, None)
+
+
+def test_trail_restores_state(test_board):
+    state = sdb.CandidateMasks(test_board)
+    cands, cells = list(state.cands), list(state.cells)
+    mark = state.Mark()
+    state.Assign(2, 3)
+    state.Assign(4, 9)
+    state.Undo(mark)
+    assert state.cands == cands and state.cells == cells
+
+
+@pytest.mark.parametrize('mode', ['copy', 'trail'])
+def test_mrv_branching(mode):
+    ns, sb_mrv = sd.SolvewBacktrack(sb.hardboard, mode=mode, branching='mrv')
+    assert ns == 1
+    assert sb_mrv == sd.SolvewBacktrack(sb.hardboard, mode=mode)[1]
+
+
+def test_mrv_picks_fewest_candidates(test_board):
+    i, j = sd.FindMRVCell(test_board)
+    assert len(sd.GetCellCandidateSet(test_board, i, j)) == \
+        min(len(sd.GetCellCandidateSet(test_board, a, b)) for a in range(9) for b in range(9) if test_board[a][b] == 0)
+
+
+@pytest.mark.parametrize('mode', ['copy', 'trail'])
+def test_max_solutions_stops_search(mode):
+    empty_board = [[0] * 9 for _ in range(9)]
+    ns, sb_first = sd.SolvewBacktrack(empty_board, mode=mode, max_solutions=2)
+    assert ns == 2
+    assert sd.BoardIsValid(sb_first) and sd.BoardSolved(sb_first)
+
+
+def test_max_solutions_unique_board():
+    assert sd.SolvewBacktrack(sb.hardboard, mode='trail', max_solutions=2)[0] == 1
+
+
+@pytest.mark.parametrize('mode', ['trail', 'propagate'])
+def test_iter_solutions(mode, test_board):
+    solns = list(sd.IterSolutions(sb.multi_board, mode=mode))
+    assert len(solns) == sd.Solve(sb.multi_board)[0] == 2
+    assert solns[0] != solns[1] and all(sd.BoardSolved(s) and sd.BoardIsValid(s) for s in solns)
+    assert solns[0] == sd.Solve(sb.multi_board, mode=mode, branching='mrv')[1]
+
+    # Take the first few solutions of a board with very many
+    first = list(islice(sd.IterSolutions([[0] * 9 for _ in range(9)], mode=mode), 5))
+    assert len({sd.BoardToString(s) for s in first}) == 5
+
+    test_board[4][4] = 5
+    test_board[8][8] = 1
+    assert list(sd.IterSolutions(test_board, mode=mode)) == []
+
+
+@pytest.mark.parametrize('board', [sb.easyboard, sb.hardboard, sb.vhardboard, sb.xwingboard, sb.multi_board])
+def test_dlx_matches_backtrack(board):
+    ns, sb_dlx = sd.Solve(board, backend='dlx')
+    assert ns == sd.Solve(board, mode='trail')[0]
+    if ns == 1:
+        assert sb_dlx == sd.Solve(board)[1]
+
+
+def test_dlx_invalid_and_limited(test_board):
+    assert sd.Solve([[0] * 9 for _ in range(9)], backend='dlx', max_solutions=3)[0] == 3
+    test_board[4][4] = 5
+    test_board[8][8] = 1
+    assert sd.Solve(test_board, backend='dlx') == (0, None)
+
+
+def test_board_string_round_trip(test_board):
+    str_board = sd.BoardToString(test_board)
+    assert sd.BoardFromString(str_board.replace('0', '.')) == test_board
+    assert sd.BoardFromString(str_board[:80]) is None
+    assert sd.BoardFromString(str_board + '\n') is None
+    assert sd.BoardFromString(str_board + ' ') is None
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_solve_batch_in_order(processes):
+    puzzles = [sd.BoardToString(b) for b in [sb.hardboard, sb.multi_board, sb.easyboard]] + ['12x']
+    results = list(sbt.SolveBatch(puzzles, processes=processes, chunksize=1, cache_size=4))
+    assert [r.puzzle for r in results] == puzzles
+    assert [r.num_solns for r in results] == [1, 2, 1, -1]
+    assert sd.BoardFromString(results[0].solution) == sd.Solve(sb.hardboard)[1]
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_count_solutions_parallel(processes):
+    board = [list(row) for row in sb.multi_board]
+    for i, j in [(0, 0), (0, 2), (0, 4), (1, 3)]:
+        board[i][j] = 0
+    num_solns = sd.Solve(board, mode='propagate', branching='mrv')[0]
+
+    subproblems = list(sds.IterSubproblems(board, 3))
+    assert len(subproblems) > 1
+    assert sum(sd.Solve(sub, mode='propagate')[0] for sub in subproblems) == num_solns
+
+    reports = []
+    assert sbt.CountSolutionsParallel(board, 3, processes, progress=lambda *args: reports.append(args)) == num_solns
+    assert [r[0] for r in reports] == list(range(1, len(subproblems) + 1))
+    assert reports[-1] == (len(subproblems), len(subproblems), num_solns)
+    assert sbt.CountSolutionsParallel(sb.hardboard, 2, processes) == 1
+
+
+def test_numpy_batch_candidates_and_duplicates(test_board):
+    # Needs the numpy extra
+    pytest.importorskip('numpy')
+    import sudoku_numpy as snp
+    invalid_board = [list(row) for row in test_board]
+    invalid_board[4][4] = 3
+    boards = snp.BoardsFromStrings([sd.BoardToString(b) for b in [test_board, invalid_board, sb.hardboard]])
+
+    cands = snp.BatchCandidates(boards)
+    for b, board in enumerate([test_board, invalid_board, sb.hardboard]):
+        cand_board = sd.SolveCandidates(board)
+        for i in range(9):
+            for j in range(9):
+                assert {n + 1 for n in range(9) if cands[b, i, j, n]} == cand_board[i][j]
+
+    valid, duplicates = snp.BatchFindDuplicates(boards)
+    assert list(valid) == [True, False, True]
+    assert {(i, j) for i in range(9) for j in range(9) if duplicates[1, i, j]} == set(sd.FindDuplicates(invalid_board))
+
+
+def test_geometry_tables():
+    assert len(sdc.UNITS) == 27 and all(len(set(unit)) == 9 for unit in sdc.UNITS)
+    assert sdc.PEERS[0] == tuple(sorted(set(range(1, 9)) | set(range(9, 81, 9)) | {10, 11, 19, 20}))
+    assert sdc.CELL_UNITS[40] == (4, 13, 22)
+    assert sdc.INTERSECTIONS[sdc.BLOCK_UNIT + 4][3] == (30, 31, 32)
+
+
+def test_model_incremental_validity(test_board):
+    model = SudokuModel(test_board)
+    assert model.BoardValid()
+
+    invalid = set()
+    for i, j, value in [(4, 4, 3), (8, 8, 1), (0, 2, 7), (4, 4, 0), (0, 2, 3), (8, 8, 0), (0, 2, 0)]:
+        changed = model.SetCell(i, j, value)
+        assert changed == invalid ^ set(sd.FindDuplicates(model.GetBoard()))
+        invalid = set(sd.FindDuplicates(model.GetBoard()))
+        assert model.GetInvalidCells() == invalid
+    assert model.BoardValid()
+
+    model.SetCell(4, 4, 3)
+    assert model.Solve() == -1
+    board = [list(row) for row in model.GetBoard()]
+    model.FillinSingleCandidatesStep()
+    assert model.GetBoard() == board
+
+    # Filling in singles keeps the tracked validity in step with the board
+    model.SetCell(4, 4, 0)
+    model.RegenCandidates()
+    model.FillinSingleCandidatesStep()
+    assert model.GetBoard() != board and model.BoardValid()
+    assert model.GetInvalidCells() == set(sd.FindDuplicates(model.GetBoard()))
+
+
+@pytest.mark.parametrize('board', [sb.easyboard, sb.medboard, sb.hardboard, sb.expertboard2])
+def test_propagate_singles_consistent(board):
+    soln = sd.Solve(board)[1]
+    new_board, cand_board, num_naked, num_hidden = sd.PropagateSingles(board, sd.SolveCandidates(board))
+    filled = sum(1 for i in range(9) for j in range(9) if new_board[i][j] and not board[i][j])
+    assert num_naked + num_hidden == filled
+    assert all(new_board[i][j] in (0, soln[i][j]) for i in range(9) for j in range(9))
+    assert all(soln[i][j] in cand_board[i][j] for i in range(9) for j in range(9))
+
+
+def test_propagate_singles_solves_easy_board():
+    new_board, _, num_naked, num_hidden = sd.PropagateSingles(sb.easyboard, sd.SolveCandidates(sb.easyboard))
+    assert sd.BoardSolved(new_board) and sd.BoardIsValid(new_board)
+
+
+@pytest.mark.parametrize('board', [sb.hardboard, sb.expertboard2])
+def test_propagate_leaves_no_hidden_singles(board):
+    state = sdb.CandidateMasks(board)
+    assert state.Propagate(hidden=True) is not None
+    assert not sdp.HiddenSingles(state.ToBoard(), state.ToCandBoard())
+
+
+def test_propagate_contradiction(test_board):
+    state = sdb.CandidateMasks(test_board)
+    state.cands[2] = 0
+    assert state.Propagate() is None
+
+
+@pytest.mark.parametrize('eliminations', [(), ('intersections',), (sds.PatternElimination(sdp.NakedPairs),)])
+@pytest.mark.parametrize('board', [sb.hardboard, sb.xwingboard, sb.multi_board])
+def test_propagate_mode_matches_trail(board, eliminations):
+    ns, sb_prop = sd.Solve(board, mode='propagate', eliminations=eliminations)
+    assert (ns, sb_prop) == sd.Solve(board, mode='trail') or (ns > 1 and ns == sd.Solve(board, mode='trail')[0])
+
+
+def test_eliminate_intersections_keeps_solution():
+    soln = sd.Solve(sb.hardboard)[1]
+    state = sdb.CandidateMasks(sb.hardboard)
+    assert sds.EliminateIntersections(state) > 0
+    assert all(state.cands[9 * i + j] & sdb.DIGIT_BITS[soln[i][j]] for i in range(9) for j in range(9))
+
+
+def test_benchmark_run_and_compare():
+    import benchmark
+
+    boards = benchmark.LoadBoards()
+    assert 'hardboard' in boards and 'corpus_00' in boards
+    options = {'mode': 'propagate', 'branching': 'mrv'}
+    targets = benchmark.BenchmarkTargets(options)
+    results = benchmark.RunBenchmarks({'hardboard': sb.hardboard}, targets, repeats=2, solver_options=options)
+    assert set(results) == set(targets) and results['SolvewBacktrack']['hardboard']['nodes'] >= 1
+
+    report = {'results': results}
+    slower = {'results': {'NakedPairs': {'hardboard': {'median_ms': 100.0}}}}
+    assert benchmark.CompareResults(report, report) == []
+    assert benchmark.CompareResults(slower, report) == [('NakedPairs', 'hardboard',
+                                                         results['NakedPairs']['hardboard']['median_ms'], 100.0)]
+
+
+@pytest.mark.parametrize('options', [{'mode': 'copy'}, {'mode': 'trail', 'branching': 'mrv'},
+                                     {'mode': 'propagate', 'branching': 'mrv'}, {'backend': 'dlx'}])
+def test_search_stats(options):
+    stats = sds.SearchStats()
+    assert sd.Solve(sb.hardboard, stats=stats, **options)[0] == 1
+    assert stats.nodes >= 1 and stats.max_depth >= 1 and stats.wall_seconds > 0
+    assert stats.propagate_seconds <= stats.wall_seconds
+
+
+def test_model_solve_stats():
+    model = SudokuModel(sb.hardboard)
+    assert model.Solve() == 1
+    stats = model.GetSolveStats()
+    assert stats.naked_singles + stats.hidden_singles > 0
+    model.ResetBoard()
+    assert model.GetSolveStats() is None
+
+
+def test_board_type(test_board):
+    board = Board(test_board)
+    assert board.ToList() == test_board and board.ToList() is not board.ToList()
+    assert board[0][1] == 8 and board.GetCell(8, 8) == 7
+    assert Board.FromString(board.ToString().replace('0', '.')) == board
+    assert Board.FromString('12x') is None
+    assert Board.FromString(board.ToString() + '\n') is None
+    assert Board.FromString(board.ToString() + ' ') is None
+
+    changed = board.WithCell(0, 2, 3)
+    assert changed.GetCell(0, 2) == 3 and board.GetCell(0, 2) == 0
+    assert len({board, Board(test_board), changed}) == 2
+    with pytest.raises(AttributeError):
+        board.cells = bytes(81)
+    assert sd.SolvewBacktrack(board) == sd.SolvewBacktrack(test_board)
+
+
+def test_solution_cache():
+    cache = SolutionCache(maxsize=2)
+    result = cache.Solve(sb.hardboard, max_solutions=2)
+    assert cache.Solve(Board.FromString(sd.BoardToString(sb.hardboard).replace('0', '.')), max_solutions=2) == result
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # The returned solution is a copy
+    result[1][0][0] = 0
+    assert cache.Solve(sb.hardboard, max_solutions=2)[1][0][0] != 0
+
+    cache.Solve(sb.easyboard)
+    cache.Solve(sb.multi_board)
+    assert len(cache) == 2 and cache.Key(sb.hardboard, max_solutions=2) not in cache
+    assert cache.Invalidate(sb.easyboard) == 1 and len(cache) == 1
+
+
+def test_model_solve_uses_cache():
+    model = SudokuModel(sb.hardboard)
+    assert model.Solve() == 1 and model.GetSolveStats() is not None
+    model.ResetBoard()
+    assert model.Solve() == 1 and model.GetSolveStats() is None
+    assert model.solution_cache.hits == 1
+    assert sd.BoardSolved(model.GetBoard())
+
+
+@pytest.mark.parametrize('board', [sb.hardboard, sb.xwingboard, sb.multi_board])
+def test_canonical_form(board):
+    canon, transform = sdn.CanonicalForm(board)
+    assert sdn.ApplyTransform(board, transform) == canon.ToList()
+    assert sdn.ApplyTransform(canon, sdn.InverseTransform(transform)) == board
+
+    variant = sdn.ApplyTransform(board, sdn.Transform(True, sdn.LINE_PERMS[700], sdn.LINE_PERMS[123],
+                                                      (0, 5, 3, 9, 1, 2, 8, 7, 4, 6)))
+    assert variant != board and sdn.CanonicalForm(variant)[0] == canon
+
+
+def test_canonical_solution_cache():
+    cache = SolutionCache(canonical=True)
+    variant = sdn.ApplyTransform(sb.hardboard, sdn.Transform(False, sdn.LINE_PERMS[5], sdn.LINE_PERMS[900],
+                                                             (0, 2, 1, 3, 4, 5, 6, 7, 9, 8)))
+    assert cache.Solve(sb.hardboard) == sd.Solve(sb.hardboard)
+    num_solns, soln_board = cache.Solve(variant)
+    assert cache.hits == 1 and num_solns == 1
+    assert soln_board == sd.Solve(variant)[1]
+
+
+# Geometric transforms of a cell that each symmetry leaves the clue pattern unchanged under
+SYMMETRY_TRANSFORMS = {
+    'none': [],
+    'rotational': [lambda i, j: (8 - i, 8 - j)],
+    'mirror': [lambda i, j: (i, 8 - j)],
+    'diagonal': [lambda i, j: (j, i)],
+    'dihedral': [lambda i, j: (j, 8 - i), lambda i, j: (8 - i, 8 - j), lambda i, j: (i, 8 - j),
+                 lambda i, j: (8 - i, j), lambda i, j: (j, i), lambda i, j: (8 - j, 8 - i)],
+}
+
+
+@pytest.mark.parametrize('symmetry', sdg.SYMMETRIES)
+def test_generate_puzzle(symmetry):
+    generated = sdg.GeneratePuzzle(seed=3, symmetry=symmetry, min_clues=24)
+    board = sd.BoardFromString(generated.puzzle)
+    assert sd.Solve(board) == (1, sd.BoardFromString(generated.solution))
+    assert generated.num_clues == 81 - generated.puzzle.count('0') >= 24
+
+    filled = {(i, j) for i in range(9) for j in range(9) if board[i][j]}
+    for transform in SYMMETRY_TRANSFORMS[symmetry]:
+        assert {transform(i, j) for i, j in filled} == filled
+
+
+def test_generate_puzzles_deterministic():
+    inline = list(sdg.GeneratePuzzles(3, seed=10, processes=1))
+    assert [p.seed for p in inline] == [10, 11, 12]
+    assert list(sdg.GeneratePuzzles(3, seed=10, processes=2, chunksize=1)) == inline
+
+
+def test_rate_puzzle():
+    rating = sdr.RatePuzzle(sb.xwingboard)
+    assert rating.solved and rating.grade == 3.2
+    assert rating.counts['x_wing'] >= 1 and sum(rating.counts.values()) == len(rating.steps)
+    assert rating.steps[0].technique == 'hidden_single' and rating.steps[0].placements > 0
+
+    assert sdr.RatePuzzle(sb.easyboard).grade < rating.grade
+    assert not sdr.RatePuzzle(sb.multi_board).solved
+    assert sdr.RatePuzzle(sb.multi_board).grade == sdr.UNSOLVED_GRADE
+
+
+def test_rate_batch():
+    puzzles = [sd.BoardToString(b) for b in [sb.easyboard, sb.hardboard]] + ['12x']
+    results = list(sdr.RateBatch(puzzles, processes=2, chunksize=1))
+    assert [p for p, _ in results] == puzzles and results[2][1] is None
+    assert results[1][1] == sdr.RatePuzzle(sb.hardboard)
+
+
+def test_pattern_cache_matches_full_search():
+    board = [list(row) for row in sb.xwingboard]
+    cand_board = sd.SolveCandidates(board)
+    patterns = PatternCache()
+    full_funcs = {'naked_pair': sdp.NakedPairs, 'pointing_pair': sdp.PointingPairs, 'x_wing': sdp.XWings,
+                  'box_line_pair': sdp.BoxLinePairs, 'box_triple': sdp.BoxTriples, 'swordfish': sdp.Swordfish,
+                  'jellyfish': sdp.Jellyfish, 'naked_quad': lambda *args: sdp.NakedSubsets(*args, 4),
+                  'hidden_triple': lambda *args: sdp.HiddenSubsets(*args, 3)}
+
+    for i, j, n in [(None, None, None), (0, 2, 6), (4, 4, 5), (8, 1, 3)]:
+        if i is not None:
+            cand_board[i][j] ^= {n}
+            patterns.MarkCellChanged(i, j, {n})
+        assert patterns.Find('hidden_single', board, cand_board) == sdp.HiddenSingles(board, cand_board)
+        for name, func in full_funcs.items():
+            assert patterns.Find(name, board, cand_board) == func(board, cand_board)
+    assert not any(patterns.dirty[name] for name in full_funcs)
+
+
+def test_model_find_pattern(test_board):
+    model = SudokuModel(test_board)
+    model.RegenCandidates()
+    assert model.FindPattern('hidden_single') == sdp.HiddenSingles(test_board, model.GetAllCands())
+    model.FindPattern('naked_pair')
+
+    assert not model.ToggleCandidate(0, 2, 3)
+    assert model.patterns.dirty['naked_pair'] == {0, 9 + 2, 18}
+    model.SetCell(0, 2, 5)
+    model.UpdateCandidates()
+    board, cand_board = model.GetBoard(), model.GetAllCands()
+    assert model.FindPattern('hidden_single') == sdp.HiddenSingles(board, cand_board)
+    assert model.FindPattern('naked_pair') == sdp.NakedPairs(board, cand_board)
+
+
+def test_digit_positions(test_board):
+    cand_board = sd.SolveCandidates(test_board)
+    positions = sdp.DigitPositions(test_board, cand_board)
+    for u, unit in enumerate(sdc.UNIT_COORDS):
+        for n in range(1, 10):
+            expected = [c for c, (i, j) in enumerate(unit) if test_board[i][j] == 0 and n in cand_board[i][j]]
+            assert list(sdp.MASK_INDEXES[positions[u][n]]) == expected
+
+    board = sb.xwingboard
+    cand_board = sd.SolveCandidates(board)
+    positions = sdp.DigitPositions(board, cand_board)
+    for func in [sdp.HiddenSingles, sdp.PointingPairs, sdp.BoxLinePairs, sdp.XWings]:
+        assert func(board, cand_board, positions) == func(board, cand_board)
+
+
+def test_fish():
+    # A size 2 fish is an X-wing
+    cand_board = sd.SolveCandidates(sb.xwingboard)
+    xwing_removals = set(sdp.XWings(sb.xwingboard, cand_board).Removals())
+    assert set(sdp.Fish(sb.xwingboard, cand_board, 2).Removals()) == xwing_removals
+
+    # Swordfish on 6 in columns 1, 4 and 7, which can be removed from the rest of rows 1, 4 and 7
+    board = [[0] * 9 for _ in range(9)]
+    cand_board = [[set(range(1, 10)) for _ in range(9)] for _ in range(9)]
+    for j in range(9):
+        for i in range(9):
+            if j in (1, 4, 7) and i not in ((1, 4), (4, 7), (1, 7))[j // 3]:
+                cand_board[i][j].discard(6)
+    values, removals = sdp.Swordfish(board, cand_board).ToPatternInfo()
+    assert {(p.i, p.j) for p in values} == {(1, 1), (4, 1), (4, 4), (7, 4), (1, 7), (7, 7)}
+    assert {(p.i, p.j) for p in removals} == {(i, j) for i in (1, 4, 7) for j in range(9) if j not in (1, 4, 7)}
+    assert all(p.candidates == {6} for p in values + removals)
+
+
+def test_subsets():
+    board = [[0] * 9 for _ in range(9)]
+    cand_board = [[set(range(1, 10)) for _ in range(9)] for _ in range(9)]
+
+    # Naked triple in row 0: cells 0-2 only hold 1, 2 and 3 between them
+    cand_board[0][0], cand_board[0][1], cand_board[0][2] = {1, 2}, {2, 3}, {1, 3}
+    values, removals = sdp.FindNakedSubset(board, cand_board, sdc.ROW_COORDS[:1], 3).ToPatternInfo()
+    assert [(p.i, p.j) for p in values] == [(0, 0), (0, 1), (0, 2)]
+    assert [(p.i, p.j, p.candidates) for p in removals] == [(0, j, {1, 2, 3}) for j in range(3, 9)]
+    assert not sdp.FindNakedSubset(board, cand_board, sdc.ROW_COORDS[:1], 2)
+
+    # Hidden pair in row 8: 4 and 5 can only go in cells 7 and 8
+    for j in range(7):
+        cand_board[8][j] -= {4, 5}
+    values, removals = sdp.FindHiddenSubset(board, cand_board, sdc.ROW_COORDS[8:], 2).ToPatternInfo()
+    assert [(p.i, p.j, p.candidates) for p in values] == [(8, 7, {4, 5}), (8, 8, {4, 5})]
+    assert [(p.i, p.j, p.candidates) for p in removals] == [(8, 7, {1, 2, 3, 6, 7, 8, 9}),
+                                                             (8, 8, {1, 2, 3, 6, 7, 8, 9})]
+
+
+@pytest.mark.parametrize('board', [sb.hardboard, sb.tripboard, sb.expertboard])
+def test_naked_pairs_match_subsets(board):
+    board, cand_board = sd.FillinHiddenSingles_iterative(board, sd.SolveCandidates(board))
+    assert sdp.NakedPairs(board, cand_board) == sdp.NakedSubsets(board, cand_board, 2)
+
+
+def test_pattern_result():
+    result = sdp.PatternResult()
+    result.AddValue(0, 1, 0b11)
+    result.AddRemoval(8, 8, 0x100)
+    result.Add(40, 0b100)
+    assert list(result) == [(1, 0b11, 0), (80, 0x100, 1), (40, 0b100, 0)]
+    assert list(result.Values()) == [(1, 0b11), (40, 0b100)] and list(result.Removals()) == [(80, 0x100)]
+    assert result.ToPatternInfo() == ([sdp.PatternInfo(0, 1, {1, 2}), sdp.PatternInfo(4, 4, {3})],
+                                      [sdp.PatternInfo(8, 8, {9})])
+
+    # Results join in order, as the full searches join rows, columns and blocks
+    cand_board = sd.SolveCandidates(sb.xwingboard)
+    result = sdp.FindBoxLinePair(sb.xwingboard, cand_board, sdc.ROW_COORDS)
+    result += sdp.FindBoxLinePair(sb.xwingboard, cand_board, sdc.COL_COORDS)
+    assert len(result) and result == sdp.BoxLinePairs(sb.xwingboard, cand_board)